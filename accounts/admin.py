@@ -5,6 +5,12 @@ from .models import Account
 
 @admin.register(Account)
 class AccountAdmin(admin.ModelAdmin):
-    list_display = ("provider", "email")
+    list_display = ("provider", "email", "is_connected", "last_synced_at", "token_expires_at")
+    list_select_related = ("oauth_token",)
     search_fields = ("email",)
     ordering = ("provider", "email")
+
+    @admin.display(description="Token expires", ordering="oauth_token__expires_at")
+    def token_expires_at(self, obj):
+        token = obj.oauth_token_or_none
+        return token.expires_at if token else None
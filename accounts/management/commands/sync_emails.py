@@ -3,12 +3,47 @@ Sync emails via the same full pipeline as Celery and "Sync now" in the UI.
 Runs sync_account_emails synchronously so sync, SyncRun, and process_email queue
 all run without a Celery worker for the sync step. process_email tasks still
 require a worker to run.
+
+Accounts are synced concurrently on a small thread pool: each sync is dominated
+by provider HTTPS calls, so wall-clock time is roughly the slowest account
+rather than the sum of all of them. With --queue the syncs are instead published
+as one Celery group and run across the worker pool.
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from celery import group
 from django.core.management.base import BaseCommand
+from django.db import connections
 
 from accounts.models import Account
 from mail.tasks import sync_account_emails
 
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_QUEUE_TIMEOUT = 600
+# The command only reports on accounts; skip large text columns such as
+# signature_html and writing_style.
+ACCOUNT_FIELDS = ("id", "email", "provider", "is_connected", "last_synced_at")
+ACCOUNT_CHUNK_SIZE = 500
+
+
+def _run_sync(account_pk):
+    """Run sync_account_emails in the current thread and return its result."""
+    try:
+        return sync_account_emails.apply(args=(account_pk,)).get()
+    finally:
+        # Each pool thread opens its own DB connection; don't leak them.
+        connections.close_all()
+
+
+def _resolve_accounts(options):
+    """Return the Account queryset selected by --account-id, --email or --all."""
+    if options["account_id"]:
+        return Account.objects.filter(pk=options["account_id"])
+    if options["email"]:
+        return Account.objects.filter(email=options["email"])
+    # --all and the default both mean every connected, sync-enabled account.
+    return Account.objects.filter(is_connected=True, sync_enabled=True)
+
 
 class Command(BaseCommand):
     help = (
@@ -33,43 +68,114 @@ class Command(BaseCommand):
             action="store_true",
             help="Sync all connected accounts",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_MAX_WORKERS,
+            help=f"Maximum number of accounts to sync concurrently (default {DEFAULT_MAX_WORKERS})",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Dispatch syncs to Celery workers as a group instead of running them in-process",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=DEFAULT_QUEUE_TIMEOUT,
+            help=f"Seconds to wait for queued syncs with --queue (default {DEFAULT_QUEUE_TIMEOUT})",
+        )
 
     def handle(self, *args, **options):
+        accounts = _resolve_accounts(options).only(*ACCOUNT_FIELDS)
         if options["account_id"]:
-            accounts = Account.objects.filter(pk=options["account_id"])
-        elif options["email"]:
-            accounts = Account.objects.filter(email=options["email"])
-        elif options["all"]:
-            accounts = Account.objects.filter(is_connected=True, sync_enabled=True)
+            # A primary-key lookup is at most one row; fetch it directly.
+            account = accounts.first()
+            rows = [account] if account is not None else []
         else:
-            accounts = Account.objects.filter(is_connected=True, sync_enabled=True)
+            # Stream rows in chunks (server-side cursor on Postgres) rather than
+            # loading the whole result set at once.
+            rows = accounts.iterator(chunk_size=ACCOUNT_CHUNK_SIZE)
+        found = False
+        accounts_list = []
+        for account in rows:
+            found = True
+            if not account.is_connected:
+                self.stdout.write(
+                    self.style.WARNING(f"Account {account.email} is not connected. Skipping.")
+                )
+                continue
+            accounts_list.append(account)
 
-        if not accounts.exists():
+        if not found:
             self.stdout.write(self.style.WARNING("No connected accounts found to sync."))
             return
 
-        for account in accounts:
-            self.stdout.write(f"\nSyncing {account.email} ({account.provider})...")
+        if not accounts_list:
+            self.stdout.write(self.style.SUCCESS("\nSync complete."))
+            return
 
-            if not account.is_connected:
-                self.stdout.write(
-                    self.style.WARNING(f"  Account {account.email} is not connected. Skipping.")
-                )
-                continue
+        if options["queue"]:
+            results = self._sync_queued(accounts_list, options["timeout"])
+        else:
+            results = self._sync_in_process(accounts_list, options["workers"])
+
+        total_created = 0
+        total_updated = 0
+        for account, out in results:
+            created, updated = self._report(account, out)
+            total_created += created
+            total_updated += updated
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nSync complete. {total_created} new, {total_updated} updated."
+            )
+        )
 
-            try:
-                result = sync_account_emails.apply(args=(account.pk,))
-                out = result.get()
-                if isinstance(out, dict) and "error" in out:
-                    self.stdout.write(self.style.ERROR(f"  Error: {out['error']}"))
-                else:
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"  Synced {out.get('total', 0)} emails "
-                            f"({out.get('created', 0)} new, {out.get('updated', 0)} updated)"
-                        )
-                    )
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"  Error syncing {account.email}: {e}"))
-
-        self.stdout.write(self.style.SUCCESS("\nSync complete."))
+    def _sync_in_process(self, accounts_list, workers):
+        """Run syncs on a local thread pool, yielding (account, result) as each finishes."""
+        max_workers = max(1, min(workers, len(accounts_list)))
+        self.stdout.write(
+            f"Syncing {len(accounts_list)} account(s) with {max_workers} worker(s)..."
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_run_sync, account.pk): account
+                for account in accounts_list
+            }
+            for future in as_completed(futures):
+                try:
+                    out = future.result()
+                except Exception as e:
+                    out = e
+                yield futures[future], out
+
+    def _sync_queued(self, accounts_list, timeout):
+        """Publish one Celery group for all accounts and wait for every result."""
+        self.stdout.write(f"Queuing sync for {len(accounts_list)} account(s)...")
+        job = group(sync_account_emails.s(account.pk) for account in accounts_list)
+        async_result = job.apply_async()
+        # propagate=False returns failed tasks' exceptions in place of their results.
+        results = async_result.get(timeout=timeout, propagate=False)
+        return zip(accounts_list, results)
+
+    def _report(self, account, out):
+        """Print one account's sync outcome and return its (created, updated) counts."""
+        label = f"{account.email} ({account.provider})"
+        if isinstance(out, Exception):
+            self.stdout.write(self.style.ERROR(f"  Error syncing {label}: {out}"))
+            return 0, 0
+        if isinstance(out, dict) and "error" in out:
+            self.stdout.write(self.style.ERROR(f"  {label}: Error: {out['error']}"))
+            return 0, 0
+        if isinstance(out, dict) and "skipped" in out:
+            self.stdout.write(self.style.WARNING(f"  {label}: {out['skipped']}"))
+            return 0, 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"  {label}: Synced {out.get('total', 0)} emails "
+                f"({out.get('created', 0)} new, {out.get('updated', 0)} updated)"
+            )
+        )
+        return out.get("created", 0), out.get("updated", 0)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_browserpushsubscription_notificationpreference'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(condition=models.Q(('is_connected', True), ('sync_enabled', True)), fields=['is_connected', 'sync_enabled'], name='acc_conn_sync_idx'),
+        ),
+    ]
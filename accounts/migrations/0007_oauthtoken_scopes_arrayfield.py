@@ -0,0 +1,45 @@
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0006_account_syncable_partial_index"),
+    ]
+
+    operations = [
+        # Convert the comma-separated text column in place so existing grants survive.
+        migrations.RunSQL(
+            sql=(
+                "ALTER TABLE accounts_oauthtoken ALTER COLUMN scopes "
+                "TYPE varchar(128)[] USING COALESCE("
+                "regexp_split_to_array(NULLIF(btrim(scopes), ''), '\\s*,\\s*'), "
+                "'{}'::varchar(128)[])"
+            ),
+            reverse_sql=(
+                "ALTER TABLE accounts_oauthtoken ALTER COLUMN scopes "
+                "TYPE text USING array_to_string(scopes, ',')"
+            ),
+            state_operations=[
+                migrations.AlterField(
+                    model_name="oauthtoken",
+                    name="scopes",
+                    field=django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=128),
+                        blank=True,
+                        default=list,
+                        help_text="OAuth scopes granted with this token",
+                        size=None,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="oauthtoken",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["scopes"], name="oauthtoken_scopes_gin"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_oauthtoken_scopes_arrayfield'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['email'], name='account_email_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_account_email_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='account',
+            name='accounts_ac_provide_e7555e_idx',
+        ),
+    ]
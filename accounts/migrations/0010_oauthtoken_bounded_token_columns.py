@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_remove_duplicate_provider_email_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='oauthtoken',
+            name='access_token',
+            field=models.CharField(max_length=4096),
+        ),
+        migrations.AlterField(
+            model_name='oauthtoken',
+            name='refresh_token',
+            field=models.CharField(blank=True, max_length=2048, null=True),
+        ),
+        # varchar and text are stored identically in Postgres; STORAGE MAIN is what
+        # keeps the access token compressed in the heap row instead of out-of-line.
+        migrations.RunSQL(
+            "ALTER TABLE accounts_oauthtoken ALTER COLUMN access_token SET STORAGE MAIN",
+            "ALTER TABLE accounts_oauthtoken ALTER COLUMN access_token SET STORAGE EXTENDED",
+        ),
+    ]
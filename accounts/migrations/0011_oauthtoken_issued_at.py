@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_oauthtoken_bounded_token_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oauthtoken',
+            name='issued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
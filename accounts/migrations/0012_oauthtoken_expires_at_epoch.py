@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_oauthtoken_issued_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oauthtoken',
+            name='expires_at_epoch',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE accounts_oauthtoken SET expires_at_epoch = EXTRACT(EPOCH FROM expires_at)::bigint "
+            "WHERE expires_at IS NOT NULL",
+            migrations.RunSQL.noop,
+        ),
+    ]
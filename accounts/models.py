@@ -1,5 +1,10 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
@@ -28,50 +33,101 @@ class Account(models.Model):
 
     class Meta:
         unique_together = (("provider", "email"),)
-        indexes = [models.Index(fields=["provider", "email"])]
+        indexes = [
+            # Lookups by address alone (sync_emails --email, connect flows).
+            models.Index(fields=["email"], name="account_email_idx"),
+            # Scheduled and CLI syncs select is_connected=True, sync_enabled=True.
+            models.Index(
+                fields=["is_connected", "sync_enabled"],
+                name="acc_conn_sync_idx",
+                condition=models.Q(is_connected=True, sync_enabled=True),
+            ),
+        ]
         ordering = ["provider", "email"]
 
     def __str__(self):
         return f"{self.provider} | {self.email}"
 
+    @cached_property
+    def oauth_token_or_none(self):
+        """The account's OAuthToken or None; reuses a select_related("oauth_token") join."""
+        try:
+            return self.oauth_token
+        except OAuthToken.DoesNotExist:
+            return None
+
 
 class OAuthToken(models.Model):
     """OAuth tokens for email account access (Gmail/Microsoft)"""
     account = models.OneToOneField(
         Account, on_delete=models.CASCADE, related_name="oauth_token"
     )
-    access_token = models.TextField()
-    refresh_token = models.TextField(blank=True, null=True)
+    # Provider tokens are well under these bounds; migration 0010 keeps access_token inline.
+    access_token = models.CharField(max_length=4096)
+    refresh_token = models.CharField(max_length=2048, blank=True, null=True)
     expires_at = models.DateTimeField(blank=True, null=True)
+    # When the current access token was obtained; with expires_at gives its lifetime.
+    issued_at = models.DateTimeField(blank=True, null=True)
+    # expires_at as POSIX seconds, kept in sync by save(); used by hot-path expiry checks.
+    expires_at_epoch = models.BigIntegerField(blank=True, null=True, db_index=True)
     token_type = models.CharField(max_length=32, default="Bearer")
-    scopes = models.TextField(
+    scopes = ArrayField(
+        models.CharField(max_length=128),
+        default=list,
         blank=True,
-        help_text="Comma-separated list of OAuth scopes granted with this token",
+        help_text="OAuth scopes granted with this token",
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [models.Index(fields=["account", "expires_at"])]
+        indexes = [
+            models.Index(fields=["account", "expires_at"]),
+            GinIndex(fields=["scopes"], name="oauthtoken_scopes_gin"),
+        ]
 
     def __str__(self):
         return f"Token for {self.account}"
 
+    def save(self, *args, **kwargs):
+        self.sync_expires_at_epoch()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "expires_at" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "expires_at_epoch"}
+        super().save(*args, **kwargs)
+
+    def sync_expires_at_epoch(self):
+        """Recompute expires_at_epoch; call before bulk_update, which skips save()."""
+        self.expires_at_epoch = int(self.expires_at.timestamp()) if self.expires_at else None
+
     def is_expired(self):
-        if not self.expires_at:
+        return self.expires_at is not None and timezone.now() >= self.expires_at
+
+    def refresh_threshold_seconds(self) -> float:
+        """Seconds before expiry at which this token should be refreshed."""
+        if self.issued_at and self.expires_at:
+            lifetime = (self.expires_at - self.issued_at).total_seconds()
+            return max(60, lifetime * settings.OAUTH_REFRESH_THRESHOLD_RATIO)
+        # Tokens saved before issued_at was recorded
+        return 300
+
+    def expires_soon(self) -> bool:
+        if self.expires_at is None:
             return False
-        from django.utils import timezone
-        return timezone.now() >= self.expires_at
+        remaining = (self.expires_at - timezone.now()).total_seconds()
+        return remaining < self.refresh_threshold_seconds()
 
     def get_scopes_list(self):
         """Get scopes as a list"""
-        if not self.scopes:
-            return []
-        return [s.strip() for s in self.scopes.split(",") if s.strip()]
+        return self.scopes or []
 
-    def set_scopes_list(self, scopes_list):
-        """Set scopes from a list"""
-        self.scopes = ",".join(scopes_list) if scopes_list else ""
+    def set_scopes_list(self, scopes_list) -> bool:
+        """Set scopes from a list; returns False (and keeps the old list) if the set is unchanged."""
+        scopes_list = list(scopes_list or [])
+        if set(scopes_list) == set(self.scopes or []):
+            return False
+        self.scopes = scopes_list
+        return True
 
 
 class NotificationPreference(models.Model):
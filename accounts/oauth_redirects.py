@@ -1,7 +1,38 @@
+from functools import lru_cache
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.urls import reverse
 
 
+@lru_cache(maxsize=1)
+def _get_override_map() -> dict:
+    """Provider-specific redirect URI overrides, keyed by callback view name."""
+    return {
+        "google_oauth_callback": settings.GOOGLE_OAUTH_REDIRECT_URI,
+        "gmail_oauth_callback": settings.GMAIL_OAUTH_REDIRECT_URI,
+        "microsoft_oauth_callback": settings.MICROSOFT_OAUTH_REDIRECT_URI,
+        "microsoft_email_oauth_callback": settings.MICROSOFT_EMAIL_OAUTH_REDIRECT_URI,
+    }
+
+
+@lru_cache(maxsize=8)
+def _resolve_callback(callback_view_name: str) -> tuple[str, str]:
+    """Return (explicit override URI, callback path); one of them is empty."""
+    explicit_uri = (_get_override_map().get(callback_view_name) or "").strip()
+    if explicit_uri:
+        return explicit_uri, ""
+    return "", reverse(callback_view_name)
+
+
+@receiver(setting_changed)
+def _clear_resolved_callbacks(**kwargs):
+    # Settings and URLconf are fixed in production; tests may override them.
+    _get_override_map.cache_clear()
+    _resolve_callback.cache_clear()
+
+
 def build_oauth_redirect_uri(request, callback_view_name: str) -> str:
     """
     Build a stable OAuth redirect URI.
@@ -11,17 +42,10 @@ def build_oauth_redirect_uri(request, callback_view_name: str) -> str:
     2) APP_BASE_URL + callback path
     3) request.build_absolute_uri(callback path) fallback
     """
-    override_map = {
-        "google_oauth_callback": settings.GOOGLE_OAUTH_REDIRECT_URI,
-        "gmail_oauth_callback": settings.GMAIL_OAUTH_REDIRECT_URI,
-        "microsoft_oauth_callback": settings.MICROSOFT_OAUTH_REDIRECT_URI,
-        "microsoft_email_oauth_callback": settings.MICROSOFT_EMAIL_OAUTH_REDIRECT_URI,
-    }
-    explicit_uri = (override_map.get(callback_view_name) or "").strip()
+    explicit_uri, path = _resolve_callback(callback_view_name)
     if explicit_uri:
         return explicit_uri
 
-    path = reverse(callback_view_name)
     if settings.APP_BASE_URL:
         return f"{settings.APP_BASE_URL}{path}"
 
@@ -1,7 +1,11 @@
+from django.core.cache import cache
 from rest_framework import serializers
 
 from .models import Account
 
+SERIALIZED_ACCOUNT_KEY = "accounts:serialized:{account_id}:{updated_at}"
+SERIALIZED_ACCOUNT_TIMEOUT = 3600
+
 
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,3 +17,16 @@ class AccountSerializer(serializers.ModelSerializer):
             "signature_html",
             "writing_style",
         ]
+
+    def to_representation(self, instance):
+        # Keyed by updated_at, so any save() of the account produces a new entry.
+        if instance.pk is None or instance.updated_at is None:
+            return super().to_representation(instance)
+        key = SERIALIZED_ACCOUNT_KEY.format(
+            account_id=instance.pk, updated_at=instance.updated_at.timestamp()
+        )
+        data = cache.get(key)
+        if data is None:
+            data = super().to_representation(instance)
+            cache.set(key, data, SERIALIZED_ACCOUNT_TIMEOUT)
+        return data
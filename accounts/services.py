@@ -1,21 +1,27 @@
-import json
-import os
+import hashlib
 import secrets
 import logging
+import os
+import re
+import threading
 import time
 import warnings
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone as std_timezone
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from msal import ConfidentialClientApplication
 
 from accounts.models import Account, OAuthToken, Provider
 
@@ -24,6 +30,11 @@ logger = logging.getLogger(__name__)
 # Suppress the file_cache warning from oauth2client
 warnings.filterwarnings('ignore', message='.*file_cache.*oauth2client.*', category=UserWarning)
 
+# Google returns more scopes than requested (e.g. 'openid'); oauthlib raises
+# a Warning on any scope change unless this is set. Set once here rather than
+# catching the Warning around every token exchange.
+os.environ.setdefault("OAUTHLIB_RELAX_TOKEN_SCOPE", "1")
+
 # Suppress INFO level logging for oauth2client/file_cache messages from Google libs
 for logger_name in [
     'oauth2client', 'oauth2client.client', '__init__',
@@ -32,49 +43,310 @@ for logger_name in [
     _log = logging.getLogger(logger_name)
     _log.setLevel(logging.WARNING)
 
-# Also suppress via logging filter for any logger that contains file_cache messages
-class FileCacheFilter(logging.Filter):
-    def filter(self, record):
-        return 'file_cache' not in str(record.getMessage()).lower()
-
-# Apply filter to root logger to catch all file_cache messages
-logging.getLogger().addFilter(FileCacheFilter())
-
 User = get_user_model()
 
+# Refresh errors meaning the refresh token itself is invalid; the account must be
+# reconnected. Anything else (network, rate limits) is treated as transient.
+_GOOGLE_PERMANENT_ERROR_RE = re.compile(
+    r"invalid_grant|invalid_token|unauthorized_client|invalid_request|missing required parameter",
+    re.IGNORECASE,
+)
+_MICROSOFT_PERMANENT_ERROR_RE = re.compile(
+    r"invalid_grant|invalid_client|unauthorized_client", re.IGNORECASE
+)
+
+# Shared HTTP session for Graph, MSAL and Google token endpoint calls, so repeated
+# requests reuse pooled keep-alive connections instead of a new TLS handshake.
+# Transient provider errors on idempotent requests (profile GETs) are retried
+# with backoff, honouring Retry-After up to HTTP_RETRY_AFTER_MAX_SECONDS. POSTs are
+# not retried: an authorization code is single-use, so re-sending an exchange
+# could turn a 5xx into invalid_grant.
+HTTP_RETRY_AFTER_MAX_SECONDS = 5
+
+
+class _CappedRetry(Retry):
+    """Retry that waits at most HTTP_RETRY_AFTER_MAX_SECONDS for a Retry-After."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, HTTP_RETRY_AFTER_MAX_SECONDS)
+
+
+_HTTP_RETRY = _CappedRetry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    raise_on_status=False,
+)
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=_HTTP_RETRY)
+)
+_GAUTH_REQUEST = Request(session=_HTTP_SESSION)
+# (connect, read) timeout for profile lookups made during OAuth callbacks.
+USER_INFO_HTTP_TIMEOUT = (3, 10)
+
+# Provider profile responses, cached briefly per access token so repeated
+# lookups during one login skip the HTTP call. Tokens are hashed, never stored.
+USER_INFO_CACHE_KEY = "accounts:userinfo:{provider}:{token_hash}"
+USER_INFO_CACHE_TIMEOUT = 300
+
+
+def _cached_user_info(provider: str, access_token: str, fetch) -> dict:
+    token_hash = hashlib.sha256(access_token.encode()).hexdigest()
+    key = USER_INFO_CACHE_KEY.format(provider=provider, token_hash=token_hash)
+    return cache.get_or_set(key, fetch, USER_INFO_CACHE_TIMEOUT)
+
+
+# Process-local cache of valid credentials: account pk -> (credentials, usable_until).
+# Entries are served until five minutes before the token expires (the window
+# in which google-auth treats credentials as expired), so repeated API calls for
+# the same account skip the OAuthToken query and object construction.
+_CREDS_CACHE: dict = {}
+_MS_CREDS_CACHE: dict = {}
+_CREDS_CACHE_LOCK = threading.Lock()
+_CREDS_CACHE_MIN_REMAINING = timedelta(minutes=5)
+_CREDS_CACHE_MAX_SIZE = 10_000
+
+
+def _get_cached_credentials(cache: dict, account_pk):
+    with _CREDS_CACHE_LOCK:
+        entry = cache.get(account_pk)
+    if entry is None:
+        return None
+    credentials, usable_until = entry
+    # usable_until is on the monotonic clock: one float compare per hit, and
+    # unaffected by wall-clock adjustments.
+    if time.monotonic() >= usable_until:
+        return None
+    return credentials
+
+
+def _cache_credentials(cache: dict, account_pk, credentials, expires_at) -> None:
+    if account_pk is None or expires_at is None:
+        return
+    usable_until = (
+        time.monotonic()
+        + (expires_at.timestamp() - time.time())
+        - _CREDS_CACHE_MIN_REMAINING.total_seconds()
+    )
+    with _CREDS_CACHE_LOCK:
+        cache.pop(account_pk, None)
+        if len(cache) >= _CREDS_CACHE_MAX_SIZE:
+            # Evict the oldest entry (dicts keep insertion order).
+            cache.pop(next(iter(cache)))
+        cache[account_pk] = (credentials, usable_until)
+
+
+def _forget_credentials(cache: dict, account_pk) -> None:
+    with _CREDS_CACHE_LOCK:
+        cache.pop(account_pk, None)
+
+
+# One refresh at a time per account within a process; the OAuthToken row lock
+# below does the same across processes.
+_REFRESH_LOCKS: dict = defaultdict(threading.Lock)
+_REFRESH_LOCKS_GUARD = threading.Lock()
+_REFRESH_LOCKS_MAX_SIZE = 1024
+
+
+def _refresh_lock(account_pk) -> threading.Lock:
+    with _REFRESH_LOCKS_GUARD:
+        if len(_REFRESH_LOCKS) >= _REFRESH_LOCKS_MAX_SIZE:
+            for pk in [pk for pk, lock in _REFRESH_LOCKS.items() if not lock.locked()]:
+                del _REFRESH_LOCKS[pk]
+        return _REFRESH_LOCKS[account_pk]
+
+
+# Columns read and written when building and refreshing credentials.
+TOKEN_FIELDS = (
+    "id",
+    "account_id",
+    "access_token",
+    "refresh_token",
+    "expires_at",
+    "expires_at_epoch",
+    "issued_at",
+    "token_type",
+    "scopes",
+    "updated_at",
+)
+
+
+def _fetch_token_row(account: Account) -> Optional[OAuthToken]:
+    """
+    Return account's OAuthToken (or None) with only the credential columns.
+
+    Reuses a token already loaded by select_related("oauth_token") or a previous
+    call; otherwise queries it and caches it as account.oauth_token_or_none.
+    """
+    if "oauth_token_or_none" in account.__dict__ or Account.oauth_token.is_cached(account):
+        return account.oauth_token_or_none
+    oauth_token = OAuthToken.objects.only(*TOKEN_FIELDS).filter(account_id=account.pk).first()
+    account.__dict__["oauth_token_or_none"] = oauth_token
+    return oauth_token
+
+
+# Columns overwritten when a new token is saved for an account that has one.
+UPSERT_TOKEN_FIELDS = (
+    "access_token",
+    "refresh_token",
+    "expires_at",
+    "expires_at_epoch",
+    "issued_at",
+    "token_type",
+    "scopes",
+    "updated_at",
+)
+
+
+def _upsert_token(account: Account, now: Optional[datetime] = None, **values) -> OAuthToken:
+    """
+    Insert or overwrite account's OAuthToken in one INSERT ... ON CONFLICT statement.
+
+    now is the issue time (default: timezone.now()). bulk_create() skips save(),
+    so expires_at_epoch is synced here.
+    """
+    oauth_token = OAuthToken(
+        account=account, issued_at=now or timezone.now(), token_type="Bearer", **values
+    )
+    oauth_token.sync_expires_at_epoch()
+    OAuthToken.objects.bulk_create(
+        [oauth_token],
+        update_conflicts=True,
+        unique_fields=["account"],
+        update_fields=UPSERT_TOKEN_FIELDS,
+    )
+    return oauth_token
+
+
+def _single_flight_refresh(cache: dict, account: Account, build, refresh):
+    """
+    Refresh account's token unless another thread or worker just did.
+
+    Holds the per-account lock and a row lock on the OAuthToken, then re-reads
+    it: if the token is no longer close to expiry, build(oauth_token) is returned
+    without a network call; otherwise refresh(account, oauth_token) runs.
+    """
+    with _refresh_lock(account.pk):
+        cached = _get_cached_credentials(cache, account.pk)
+        if cached is not None:
+            return cached
+        with transaction.atomic():
+            oauth_token = (
+                OAuthToken.objects.select_for_update()
+                .only(*TOKEN_FIELDS)
+                .filter(account_id=account.pk)
+                .first()
+            )
+            if oauth_token is None:
+                return None
+            account.__dict__["oauth_token_or_none"] = oauth_token
+            if (
+                oauth_token.expires_at
+                and oauth_token.expires_at - timezone.now() > _CREDS_CACHE_MIN_REMAINING
+            ):
+                credentials = build(oauth_token)
+                _cache_credentials(cache, account.pk, credentials, oauth_token.expires_at)
+                return credentials
+            return refresh(account, oauth_token)
+
+
+_GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+
+@lru_cache(maxsize=4)
+def _google_web_client_config(client_id: str, client_secret: str) -> dict:
+    """The constant part of the "web" client config; callers must copy it before adding to it."""
+    return {
+        "client_id": client_id,
+        "client_secret": client_secret,
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": _GOOGLE_TOKEN_URI,
+    }
+
+
+@lru_cache(maxsize=4)
+def _google_credentials_kwargs(client_id: str, client_secret: str) -> dict:
+    """Credentials() keyword arguments that are the same for every account. Do not mutate."""
+    return {
+        "token_uri": _GOOGLE_TOKEN_URI,
+        "client_id": client_id,
+        "client_secret": client_secret,
+    }
+
+
+def _get_or_create_oauth_user(email: str, first_name: str, last_name: str) -> User:
+    """Get or create the Django User for an OAuth login, keeping the name in sync."""
+    # Providers may return mixed case; store and look up the lowercased address
+    # so the lookup is a plain equality match.
+    email = email.strip().lower()
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        # Users created before emails were normalized may be stored mixed-case.
+        user = User.objects.filter(email__iexact=email).first()
+    if user is None:
+        user, created = User.objects.get_or_create(
+            email=email,
+            defaults={
+                "username": email,
+                "first_name": first_name,
+                "last_name": last_name,
+            },
+        )
+    else:
+        created = False
+    if not created:
+        # Write only the columns whose value changed, as one UPDATE.
+        changed = {}
+        if user.first_name != first_name:
+            changed["first_name"] = first_name
+        if user.last_name != last_name:
+            changed["last_name"] = last_name
+        if changed:
+            User.objects.filter(pk=user.pk).update(**changed)
+            for field, value in changed.items():
+                setattr(user, field, value)
+    return user
+
 
 class GoogleOAuthService:
     """Unified OAuth service for both user login and email access"""
 
     # Scopes for user login (identity only)
-    LOGIN_SCOPES = [
+    LOGIN_SCOPES = (
         "openid",
         "https://www.googleapis.com/auth/userinfo.profile",
         "https://www.googleapis.com/auth/userinfo.email",
-    ]
+    )
 
     # Scopes for Gmail email access
-    GMAIL_SCOPES = [
+    GMAIL_SCOPES = (
         "https://www.googleapis.com/auth/gmail.readonly",
         "https://www.googleapis.com/auth/gmail.modify",  # For drafts
-    ]
+    )
 
     @staticmethod
     def get_oauth_flow(
         redirect_uri: str,
-        scopes: list = None,
+        scopes: Optional[Sequence[str]] = None,
         code_verifier: Optional[str] = None,
-    ) -> Flow:
+    ):
         """Create OAuth flow with specified scopes. Pass code_verifier when exchanging a code (PKCE)."""
+        # Imported here: oauthlib is only needed on the login/connect views.
+        from google_auth_oauthlib.flow import Flow
+
         if scopes is None:
             scopes = GoogleOAuthService.LOGIN_SCOPES
 
+        # Only redirect_uris varies per call; the rest is built once and copied.
         client_config = {
             "web": {
-                "client_id": settings.GOOGLE_OAUTH_CLIENT_ID,
-                "client_secret": settings.GOOGLE_OAUTH_CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
+                **_google_web_client_config(
+                    settings.GOOGLE_OAUTH_CLIENT_ID, settings.GOOGLE_OAUTH_CLIENT_SECRET
+                ),
                 "redirect_uris": [redirect_uri],
             }
         }
@@ -87,7 +359,7 @@ class GoogleOAuthService:
 
     @staticmethod
     def get_authorization_url(
-        redirect_uri: str, scopes: list = None, force_reauth: bool = False
+        redirect_uri: str, scopes: Optional[Sequence[str]] = None, force_reauth: bool = False
     ) -> Tuple[str, str, Optional[str]]:
         """Get authorization URL, state, and PKCE code_verifier for OAuth flow.
 
@@ -111,7 +383,7 @@ class GoogleOAuthService:
     def exchange_code_for_token(
         code: str,
         redirect_uri: str,
-        scopes: list = None,
+        scopes: Optional[Sequence[str]] = None,
         code_verifier: Optional[str] = None,
     ) -> Credentials:
         """Exchange authorization code for access token. Pass code_verifier from session (PKCE)."""
@@ -121,48 +393,32 @@ class GoogleOAuthService:
         flow = GoogleOAuthService.get_oauth_flow(
             redirect_uri, scopes, code_verifier=code_verifier
         )
-        # Suppress scope mismatch warnings - Google may add additional scopes like 'openid'
-        import warnings
-        # Configure oauthlib session to not treat scope mismatches as errors
-        # Set the session's scope validation to be lenient
-        if hasattr(flow.oauth2session, '_client'):
-            # Disable strict scope validation
-            flow.oauth2session._client._scope_separator = ' '
-        
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore", UserWarning)
-                try:
-                    flow.fetch_token(code=code)
-                except Warning as w:
-                    # If it's a scope mismatch warning, the credentials might still be valid
-                    if "scope" in str(w).lower() and hasattr(flow, 'credentials') and flow.credentials:
-                        # Credentials are available despite the warning
-                        pass
-                    else:
-                        raise
-        except Warning as w:
-            # Scope mismatch warnings are usually harmless - Google adds 'openid' automatically
-            if "scope" in str(w).lower():
-                # Check if credentials are still available
-                if hasattr(flow, 'credentials') and flow.credentials:
-                    return flow.credentials
-            raise
+        flow.fetch_token(code=code)
         return flow.credentials
 
     @staticmethod
     def get_user_info(credentials: Credentials) -> dict:
         """Get user info from Google OAuth credentials"""
-        from googleapiclient.discovery import build
+        def fetch():
+            # One endpoint: call it directly rather than through a discovery-built client.
+            response = _HTTP_SESSION.get(
+                "https://www.googleapis.com/oauth2/v2/userinfo",
+                headers={"Authorization": f"Bearer {credentials.token}"},
+                timeout=USER_INFO_HTTP_TIMEOUT,
+            )
+            response.raise_for_status()
+            return response.json()
 
-        service = build("oauth2", "v2", credentials=credentials)
-        user_info = service.userinfo().get().execute()
-        return user_info
+        return _cached_user_info("google", credentials.token, fetch)
 
     @staticmethod
-    def create_or_update_user(credentials: Credentials) -> User:
-        """Create or update Django User from Google OAuth"""
-        user_info = GoogleOAuthService.get_user_info(credentials)
+    def create_or_update_user(credentials: Credentials, user_info: Optional[dict] = None) -> User:
+        """Create or update Django User from Google OAuth.
+
+        Pass user_info if the caller already fetched it, to skip the userinfo request.
+        """
+        if user_info is None:
+            user_info = GoogleOAuthService.get_user_info(credentials)
         email = user_info.get("email")
         first_name = user_info.get("given_name", "")
         last_name = user_info.get("family_name", "")
@@ -170,29 +426,7 @@ class GoogleOAuthService:
         if not email:
             raise ValueError("Email not provided by Google")
 
-        # Get or create user
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                "username": email,
-                "first_name": first_name,
-                "last_name": last_name,
-            },
-        )
-
-        # Update user info if it changed
-        if not created:
-            updated = False
-            if user.first_name != first_name:
-                user.first_name = first_name
-                updated = True
-            if user.last_name != last_name:
-                user.last_name = last_name
-                updated = True
-            if updated:
-                user.save()
-
-        return user
+        return _get_or_create_oauth_user(email, first_name, last_name)
 
 
 class GmailOAuthService:
@@ -200,11 +434,11 @@ class GmailOAuthService:
 
     # Combine Gmail scopes with userinfo scopes to get email address
     # Include 'openid' since Google automatically adds it when using userinfo scopes
-    SCOPES = [
+    SCOPES = (
         "openid",  # Required when using userinfo scopes
         "https://www.googleapis.com/auth/userinfo.email",
         "https://www.googleapis.com/auth/userinfo.profile",
-    ] + GoogleOAuthService.GMAIL_SCOPES
+    ) + GoogleOAuthService.GMAIL_SCOPES
 
     @staticmethod
     def get_authorization_url(
@@ -241,66 +475,46 @@ class GmailOAuthService:
                 expires_at = credentials.expiry
 
         # Get the actual scopes granted (may include more than requested)
-        granted_scopes = list(credentials.scopes) if credentials.scopes else GmailOAuthService.SCOPES
-        scopes_str = ",".join(granted_scopes)
-
-        oauth_token, created = OAuthToken.objects.update_or_create(
-            account=account,
-            defaults={
-                "access_token": credentials.token,
-                "refresh_token": credentials.refresh_token or "",
-                "expires_at": expires_at,
-                "token_type": "Bearer",
-                "scopes": scopes_str,
-            },
-        )
-        account.is_connected = True
-        account.save(update_fields=["is_connected"])
+        # One list copy: ArrayField needs a list, and SCOPES is a tuple.
+        granted_scopes = list(credentials.scopes or GmailOAuthService.SCOPES)
+
+        # Token and account are written in one transaction (one commit).
+        with transaction.atomic():
+            oauth_token = _upsert_token(
+                account,
+                access_token=credentials.token,
+                refresh_token=credentials.refresh_token or "",
+                expires_at=expires_at,
+                scopes=granted_scopes,
+            )
+            if not account.is_connected:
+                account.is_connected = True
+                account.save(update_fields=["is_connected"])
+        account.__dict__["oauth_token_or_none"] = oauth_token
+        _forget_credentials(_CREDS_CACHE, account.pk)
         return oauth_token
 
     @staticmethod
-    def get_valid_credentials(account: Account) -> Optional[Credentials]:
-        """Get valid OAuth credentials, refreshing if necessary"""
-        try:
-            oauth_token = account.oauth_token
-        except OAuthToken.DoesNotExist:
-            return None
+    def _build_credentials(oauth_token: OAuthToken, with_access_token: bool = True) -> Credentials:
+        """Build google-auth Credentials from a stored OAuthToken.
 
+        with_access_token=False leaves out the stored (expired) access token, for refreshing.
+        """
         # Use the scopes that were originally granted with this token
         # If no scopes stored, fall back to current SCOPES (for backward compatibility)
         token_scopes = oauth_token.get_scopes_list()
         if not token_scopes:
             token_scopes = GmailOAuthService.SCOPES
 
-        # Check if token is expired or will expire soon (within 5 minutes)
-        # This prevents using expired tokens and refreshes proactively
-        is_token_expired = oauth_token.is_expired()
-        expires_soon = False
-        if oauth_token.expires_at:
-            time_until_expiry = oauth_token.expires_at - timezone.now()
-            # Refresh if token expires within 5 minutes
-            expires_soon = time_until_expiry.total_seconds() < 300
-
-        has_refresh_token = bool(oauth_token.refresh_token and str(oauth_token.refresh_token).strip())
-
-        # If token is expired and we don't have a refresh token, fail fast
-        # unless the token was just saved (e.g. from OAuth callback); then the
-        # access token from the exchange is still valid for the first sync.
-        if is_token_expired and not has_refresh_token:
-            from datetime import timedelta
-            if oauth_token.updated_at and (timezone.now() - oauth_token.updated_at) > timedelta(minutes=5):
-                return None
-            # Token saved in the last 5 minutes: use it (fresh exchange)
-
         credentials = Credentials(
-            token=oauth_token.access_token,
+            token=oauth_token.access_token if with_access_token else None,
             refresh_token=oauth_token.refresh_token or None,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_OAUTH_CLIENT_ID,
-            client_secret=settings.GOOGLE_OAUTH_CLIENT_SECRET,
             scopes=token_scopes,  # Use stored scopes, not current SCOPES
+            **_google_credentials_kwargs(
+                settings.GOOGLE_OAUTH_CLIENT_ID, settings.GOOGLE_OAUTH_CLIENT_SECRET
+            ),
         )
-        
+
         # Set expiry from DB if available. Google Auth compares expiry to naive UTC;
         # Django stores timezone-aware datetimes, so convert to naive UTC to avoid TypeError.
         if oauth_token.expires_at:
@@ -310,42 +524,127 @@ class GmailOAuthService:
                 if timezone.is_aware(exp)
                 else exp
             )
+        return credentials
 
-        # Refresh token if expired or expiring soon (proactive refresh)
-        # This ensures tokens are always fresh and users never see expiration errors
-        if (is_token_expired or expires_soon or credentials.expired) and has_refresh_token:
-            try:
-                # Refresh the token
-                credentials.refresh(Request())
-                # Update stored token and scopes (in case they changed)
-                oauth_token.access_token = credentials.token
-                # Always save the refresh token in case it was updated
-                if credentials.refresh_token:
-                    oauth_token.refresh_token = credentials.refresh_token
-                if credentials.expiry:
-                    expiry = credentials.expiry
-                    oauth_token.expires_at = (
-                        timezone.make_aware(expiry) if timezone.is_naive(expiry) else expiry
-                    )
-                # Update scopes if they changed during refresh
-                if credentials.scopes:
-                    oauth_token.set_scopes_list(list(credentials.scopes))
-                oauth_token.save()
-            except Exception as e:
-                # Only disconnect if the refresh token itself is invalid
-                # Temporary network errors or rate limits should not disconnect the account
-                error_str = str(e).lower()
-                # Check for permanent errors that indicate refresh token is invalid
-                permanent_errors = ["invalid_grant", "invalid_token", "unauthorized_client", "invalid_request", "missing required parameter"]
-                if any(keyword in error_str for keyword in permanent_errors):
-                    # Log the error for debugging
-                    logger.warning("Gmail refresh token invalid for account %s: %s", account.pk, e)
-                    GmailOAuthService.disconnect_account(account)
-                # For other errors (network, rate limits, etc.), log but don't disconnect
-                # The token might still be valid, just couldn't refresh right now
-                else:
-                    logger.warning("Gmail token refresh failed (non-fatal) for account %s: %s", account.pk, e)
+    @staticmethod
+    def _request_refresh(oauth_token: OAuthToken) -> Credentials:
+        """Ask Google for a new access token. Network only; raises if the refresh fails."""
+        credentials = GmailOAuthService._build_credentials(oauth_token, with_access_token=False)
+        credentials.refresh(_GAUTH_REQUEST)
+        return credentials
+
+    @staticmethod
+    def _apply_refresh(
+        account: Account,
+        oauth_token: OAuthToken,
+        credentials: Credentials,
+        save: bool = True,
+        now: Optional[datetime] = None,
+    ) -> Credentials:
+        """
+        Store refreshed credentials on the OAuthToken; save=False leaves the write
+        to the caller. Batch callers pass one now for every token.
+        """
+        # Update stored token and scopes (in case they changed)
+        oauth_token.access_token = credentials.token
+        oauth_token.issued_at = now or timezone.now()
+        # Always save the refresh token in case it was updated
+        if credentials.refresh_token:
+            oauth_token.refresh_token = credentials.refresh_token
+        if credentials.expiry:
+            expiry = credentials.expiry
+            oauth_token.expires_at = (
+                timezone.make_aware(expiry) if timezone.is_naive(expiry) else expiry
+            )
+        # Update scopes if they changed during refresh
+        scopes_changed = bool(credentials.scopes) and oauth_token.set_scopes_list(
+            credentials.scopes
+        )
+        if save:
+            oauth_token.save(update_fields=_refresh_update_fields(scopes_changed))
+        _cache_credentials(_CREDS_CACHE, account.pk, credentials, oauth_token.expires_at)
+        return credentials
+
+    @staticmethod
+    def _refresh_failed(account: Account, error: Exception) -> None:
+        """Log a failed refresh; disconnect only if the refresh token itself is invalid."""
+        # Temporary network errors or rate limits should not disconnect the account
+        # Check for permanent errors that indicate refresh token is invalid
+        if _GOOGLE_PERMANENT_ERROR_RE.search(str(error)):
+            # Log the error for debugging
+            logger.warning("Gmail refresh token invalid for account %s: %s", account.pk, error)
+            GmailOAuthService.disconnect_account(account)
+        # For other errors (network, rate limits, etc.), log but don't disconnect
+        # The token might still be valid, just couldn't refresh right now
+        else:
+            logger.warning("Gmail token refresh failed (non-fatal) for account %s: %s", account.pk, error)
+        return None
+
+    @staticmethod
+    def _do_refresh(account: Account, oauth_token: OAuthToken) -> Optional[Credentials]:
+        """Refresh the access token and store it. Returns None if the refresh failed."""
+        try:
+            credentials = GmailOAuthService._request_refresh(oauth_token)
+            return GmailOAuthService._apply_refresh(account, oauth_token, credentials)
+        except Exception as e:
+            return GmailOAuthService._refresh_failed(account, e)
+
+    @staticmethod
+    def get_valid_credentials(
+        account: Account, oauth_token: Optional[OAuthToken] = None
+    ) -> Optional[Credentials]:
+        """Get valid OAuth credentials, refreshing if necessary.
+
+        Pass oauth_token if the caller already has it, or load account with
+        select_related("oauth_token"), to avoid a token query per call.
+        """
+        # A disconnected account never has a usable token; skip the token lookup.
+        if not account.is_connected:
+            return None
+
+        cached = _get_cached_credentials(_CREDS_CACHE, account.pk)
+        if cached is not None:
+            return cached
+
+        if oauth_token is None:
+            oauth_token = _fetch_token_row(account)
+        if oauth_token is None:
+            return None
+
+        # Tokens close to expiry are refreshed ahead of time by the
+        # refresh_expiring_oauth_tokens periodic task; only refresh inline once
+        # the token has actually expired.
+        # Compare POSIX timestamps taken once, rather than building timedeltas.
+        now_ts = time.time()
+        is_token_expired = False
+        expires_soon = False
+        if oauth_token.expires_at_epoch is not None:
+            seconds_left = oauth_token.expires_at_epoch - now_ts
+            is_token_expired = seconds_left <= 0
+            # A fixed margin, not refresh_threshold_seconds(): with no refresh
+            # token this decides whether to disconnect the account, so it must
+            # not grow with OAUTH_REFRESH_THRESHOLD_RATIO.
+            expires_soon = seconds_left < _CREDS_CACHE_MIN_REMAINING.total_seconds()
+
+        has_refresh_token = bool(oauth_token.refresh_token and str(oauth_token.refresh_token).strip())
+
+        # If token is expired and we don't have a refresh token, fail fast
+        # unless the token was just saved (e.g. from OAuth callback); then the
+        # access token from the exchange is still valid for the first sync.
+        if is_token_expired and not has_refresh_token:
+            if oauth_token.updated_at and now_ts - oauth_token.updated_at.timestamp() > 300:
                 return None
+            # Token saved in the last 5 minutes: use it (fresh exchange)
+
+        credentials = GmailOAuthService._build_credentials(oauth_token)
+
+        if (is_token_expired or credentials.expired) and has_refresh_token:
+            return _single_flight_refresh(
+                _CREDS_CACHE,
+                account,
+                GmailOAuthService._build_credentials,
+                GmailOAuthService._do_refresh,
+            )
 
         # Do not return credentials that are expired and cannot be refreshed (would fail on first API call)
         if (credentials.expired or is_token_expired or expires_soon) and not has_refresh_token:
@@ -353,14 +652,48 @@ class GmailOAuthService:
             GmailOAuthService.disconnect_account(account)
             return None
 
+        _cache_credentials(_CREDS_CACHE, account.pk, credentials, oauth_token.expires_at)
         return credentials
 
     @staticmethod
     def disconnect_account(account: Account):
         """Disconnect account and remove OAuth token"""
-        OAuthToken.objects.filter(account=account).delete()
+        # Queryset delete/update: one statement each, no model save() or signals.
+        with transaction.atomic():
+            OAuthToken.objects.filter(account=account).delete()
+            Account.objects.filter(pk=account.pk, is_connected=True).update(is_connected=False)
         account.is_connected = False
-        account.save(update_fields=["is_connected"])
+        account.__dict__.pop("oauth_token_or_none", None)
+        _forget_credentials(_CREDS_CACHE, account.pk)
+
+
+@lru_cache(maxsize=4)
+def _get_msal_app(tenant: str, client_id: str, client_secret: str):
+    """
+    Return a shared ConfidentialClientApplication for these credentials.
+
+    Building the app resolves the authority and sets up an HTTP session, so it is
+    done once per process. The app is shared by every account, hence the cache
+    that never stores tokens. msal is imported here so that processes which never
+    talk to Microsoft (e.g. Gmail-only workers) don't pay for loading it.
+    """
+    from msal import ConfidentialClientApplication, TokenCache
+
+    class _StatelessTokenCache(TokenCache):
+        """MSAL token cache that keeps nothing; tokens are persisted in OAuthToken instead."""
+
+        def add(self, event, now=None):
+            return None
+
+    return ConfidentialClientApplication(
+        client_id=client_id,
+        client_credential=client_secret,
+        authority=f"https://login.microsoftonline.com/{tenant}",
+        token_cache=_StatelessTokenCache(),
+        # MSAL's own session has a 10-connection pool, smaller than the
+        # refresh_due_tokens thread pool; share the larger one.
+        http_client=_HTTP_SESSION,
+    )
 
 
 class MicrosoftOAuthService:
@@ -369,37 +702,30 @@ class MicrosoftOAuthService:
     # Scopes for user login (identity only)
     # Note: 'openid' and 'profile' are reserved scopes automatically included by Microsoft OAuth
     # They should not be explicitly requested
-    LOGIN_SCOPES = [
+    LOGIN_SCOPES = (
         "email",
         "User.Read",
-    ]
+    )
 
     # Scopes for Microsoft email access
-    MAIL_SCOPES = [
+    MAIL_SCOPES = (
         "Mail.Read",
         "Mail.ReadWrite",  # For drafts
         "Mail.Send",
-    ]
+    )
 
     @staticmethod
-    def get_msal_app(redirect_uri: str, scopes: list = None):
-        """Create MSAL ConfidentialClientApplication with specified scopes"""
-        if scopes is None:
-            scopes = MicrosoftOAuthService.LOGIN_SCOPES
-
-        tenant = settings.MICROSOFT_OAUTH_TENANT_ID
-        authority = f"https://login.microsoftonline.com/{tenant}"
-
-        app = ConfidentialClientApplication(
-            client_id=settings.MICROSOFT_OAUTH_CLIENT_ID,
-            client_credential=settings.MICROSOFT_OAUTH_CLIENT_SECRET,
-            authority=authority,
+    def get_msal_app(redirect_uri: str, scopes: Optional[Sequence[str]] = None):
+        """Return the shared MSAL ConfidentialClientApplication (scopes are passed per request)"""
+        return _get_msal_app(
+            settings.MICROSOFT_OAUTH_TENANT_ID,
+            settings.MICROSOFT_OAUTH_CLIENT_ID,
+            settings.MICROSOFT_OAUTH_CLIENT_SECRET,
         )
-        return app
 
     @staticmethod
     def get_authorization_url(
-        redirect_uri: str, scopes: list = None, force_reauth: bool = False
+        redirect_uri: str, scopes: Optional[Sequence[str]] = None, force_reauth: bool = False
     ) -> Tuple[str, str]:
         """Get authorization URL and state for OAuth flow
 
@@ -428,7 +754,7 @@ class MicrosoftOAuthService:
         return auth_url, state
 
     @staticmethod
-    def exchange_code_for_token(code: str, redirect_uri: str, scopes: list = None) -> dict:
+    def exchange_code_for_token(code: str, redirect_uri: str, scopes: Optional[Sequence[str]] = None) -> dict:
         """Exchange authorization code for access token"""
         if scopes is None:
             scopes = MicrosoftOAuthService.LOGIN_SCOPES
@@ -458,16 +784,26 @@ class MicrosoftOAuthService:
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json",
         }
-        
-        response = requests.get("https://graph.microsoft.com/v1.0/me", headers=headers)
-        response.raise_for_status()
-        
-        return response.json()
+
+        def fetch():
+            response = _HTTP_SESSION.get(
+                "https://graph.microsoft.com/v1.0/me",
+                headers=headers,
+                timeout=USER_INFO_HTTP_TIMEOUT,
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return _cached_user_info("microsoft", access_token, fetch)
 
     @staticmethod
-    def create_or_update_user(token_dict: dict) -> User:
-        """Create or update Django User from Microsoft OAuth"""
-        user_info = MicrosoftOAuthService.get_user_info(token_dict)
+    def create_or_update_user(token_dict: dict, user_info: Optional[dict] = None) -> User:
+        """Create or update Django User from Microsoft OAuth.
+
+        Pass user_info if the caller already fetched it, to skip the Graph /me request.
+        """
+        if user_info is None:
+            user_info = MicrosoftOAuthService.get_user_info(token_dict)
         
         # Microsoft Graph API returns 'mail' or 'userPrincipalName' for email
         email = user_info.get("mail") or user_info.get("userPrincipalName")
@@ -477,29 +813,7 @@ class MicrosoftOAuthService:
         if not email:
             raise ValueError("Email not provided by Microsoft")
 
-        # Get or create user
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                "username": email,
-                "first_name": first_name,
-                "last_name": last_name,
-            },
-        )
-
-        # Update user info if it changed
-        if not created:
-            updated = False
-            if user.first_name != first_name:
-                user.first_name = first_name
-                updated = True
-            if user.last_name != last_name:
-                user.last_name = last_name
-                updated = True
-            if updated:
-                user.save()
-
-        return user
+        return _get_or_create_oauth_user(email, first_name, last_name)
 
 
 class MicrosoftEmailOAuthService:
@@ -508,10 +822,10 @@ class MicrosoftEmailOAuthService:
     # Combine Mail scopes with userinfo scopes to get email address
     # Note: 'openid', 'profile', and 'offline_access' are reserved scopes automatically included by Microsoft OAuth
     # They should not be explicitly requested
-    SCOPES = [
+    SCOPES = (
         "email",
         "User.Read",
-    ] + MicrosoftOAuthService.MAIL_SCOPES
+    ) + MicrosoftOAuthService.MAIL_SCOPES
 
     @staticmethod
     def get_authorization_url(redirect_uri: str, force_reauth: bool = False) -> Tuple[str, str]:
@@ -533,37 +847,46 @@ class MicrosoftEmailOAuthService:
         access_token = token_dict.get("access_token")
         refresh_token = token_dict.get("refresh_token", "")
         expires_in = token_dict.get("expires_in")
-        
+
+        now = timezone.now()
         expires_at = None
         if expires_in:
-            expires_at = timezone.now() + timedelta(seconds=expires_in)
+            expires_at = now + timedelta(seconds=expires_in)
 
         # Get the actual scopes granted
-        granted_scopes = token_dict.get("scope", "").split() if token_dict.get("scope") else MicrosoftEmailOAuthService.SCOPES
-        scopes_str = ",".join(granted_scopes)
-
-        oauth_token, created = OAuthToken.objects.update_or_create(
-            account=account,
-            defaults={
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "expires_at": expires_at,
-                "token_type": "Bearer",
-                "scopes": scopes_str,
-            },
-        )
-        account.is_connected = True
-        account.save(update_fields=["is_connected"])
+        scope = token_dict.get("scope")
+        granted_scopes = scope.split() if scope else list(MicrosoftEmailOAuthService.SCOPES)
+
+        # Token and account are written in one transaction (one commit).
+        with transaction.atomic():
+            oauth_token = _upsert_token(
+                account,
+                now=now,
+                access_token=access_token,
+                refresh_token=refresh_token,
+                expires_at=expires_at,
+                scopes=granted_scopes,
+            )
+            if not account.is_connected:
+                account.is_connected = True
+                account.save(update_fields=["is_connected"])
+        account.__dict__["oauth_token_or_none"] = oauth_token
+        _forget_credentials(_MS_CREDS_CACHE, account.pk)
         return oauth_token
 
     @staticmethod
-    def get_valid_credentials(account: Account) -> Optional[dict]:
-        """Get valid OAuth credentials, refreshing if necessary"""
-        try:
-            oauth_token = account.oauth_token
-        except OAuthToken.DoesNotExist:
-            return None
+    def _credentials_dict(oauth_token: OAuthToken) -> dict:
+        """Credentials dict for a stored OAuthToken, as returned by get_valid_credentials."""
+        return {
+            "access_token": oauth_token.access_token,
+            "refresh_token": oauth_token.refresh_token,
+            "expires_at": oauth_token.expires_at,
+            "token_type": oauth_token.token_type,
+        }
 
+    @staticmethod
+    def _request_refresh(oauth_token: OAuthToken) -> dict:
+        """Ask Microsoft for a new access token. Network only; returns MSAL's result dict."""
         # Use the scopes that were originally granted with this token.
         # MSAL refresh call must not include reserved scopes.
         token_scopes = oauth_token.get_scopes_list()
@@ -577,102 +900,223 @@ class MicrosoftEmailOAuthService:
                 if s and s.lower() not in reserved_scopes
             ]
 
-        # Check if token is expired or will expire soon (within 5 minutes)
-        # This prevents using expired tokens and refreshes proactively
-        is_expired = oauth_token.is_expired()
-        expires_soon = False
-        if oauth_token.expires_at:
-            time_until_expiry = oauth_token.expires_at - timezone.now()
-            # Refresh if token expires within 5 minutes
-            expires_soon = time_until_expiry.total_seconds() < 300
+        app = _get_msal_app(
+            settings.MICROSOFT_OAUTH_TENANT_ID,
+            settings.MICROSOFT_OAUTH_CLIENT_ID,
+            settings.MICROSOFT_OAUTH_CLIENT_SECRET,
+        )
+        return app.acquire_token_by_refresh_token(
+            refresh_token=oauth_token.refresh_token,
+            scopes=refresh_scopes,
+        )
 
-        # If expired/expiring soon and we have a refresh token, refresh it proactively
-        # This ensures tokens are always fresh and users never see expiration errors
-        if (is_expired or expires_soon) and oauth_token.refresh_token:
-            try:
-                tenant = settings.MICROSOFT_OAUTH_TENANT_ID
-                authority = f"https://login.microsoftonline.com/{tenant}"
-                
-                app = ConfidentialClientApplication(
-                    client_id=settings.MICROSOFT_OAUTH_CLIENT_ID,
-                    client_credential=settings.MICROSOFT_OAUTH_CLIENT_SECRET,
-                    authority=authority,
+    @staticmethod
+    def _apply_refresh(
+        account: Account,
+        oauth_token: OAuthToken,
+        result: dict,
+        save: bool = True,
+        now: Optional[datetime] = None,
+    ) -> Optional[dict]:
+        """
+        Store an MSAL refresh result on the OAuthToken; save=False leaves the write
+        to the caller. Batch callers pass one now for every token. Returns None if
+        MSAL reported an error.
+        """
+        if "error" in result:
+            error_code = result.get("error", "")
+            error_description = result.get("error_description", "")
+            # Only disconnect for permanent errors (invalid refresh token)
+            # Temporary errors should not disconnect the account
+            if (
+                _MICROSOFT_PERMANENT_ERROR_RE.search(error_code)
+                or _MICROSOFT_PERMANENT_ERROR_RE.search(error_description)
+            ):
+                logger.warning(
+                    "Microsoft refresh token invalid for account %s: %s",
+                    account.pk, result.get("error_description", result.get("error")),
                 )
-                
-                result = app.acquire_token_by_refresh_token(
-                    refresh_token=oauth_token.refresh_token,
-                    scopes=refresh_scopes,
+                MicrosoftEmailOAuthService.disconnect_account(account)
+            else:
+                # Log non-fatal errors but don't disconnect
+                logger.warning(
+                    "Microsoft token refresh failed (non-fatal) for account %s: %s",
+                    account.pk, result.get("error_description", result.get("error")),
                 )
-                
-                if "error" in result:
-                    error_code = result.get("error", "").lower()
-                    error_description = result.get("error_description", "").lower()
-                    # Only disconnect for permanent errors (invalid refresh token)
-                    # Temporary errors should not disconnect the account
-                    permanent_errors = ["invalid_grant", "invalid_client", "unauthorized_client"]
-                    if any(err in error_code for err in permanent_errors) or any(err in error_description for err in permanent_errors):
-                        logger.warning(
-                            "Microsoft refresh token invalid for account %s: %s",
-                            account.pk, result.get("error_description", result.get("error")),
-                        )
-                        MicrosoftEmailOAuthService.disconnect_account(account)
-                    else:
-                        # Log non-fatal errors but don't disconnect
-                        logger.warning(
-                            "Microsoft token refresh failed (non-fatal) for account %s: %s",
-                            account.pk, result.get("error_description", result.get("error")),
-                        )
-                    return None
-                
-                # Update stored token
-                access_token = result.get("access_token")
-                # Always save the refresh token in case it was updated
-                refresh_token = result.get("refresh_token", oauth_token.refresh_token)
-                expires_in = result.get("expires_in")
-                
-                expires_at = None
-                if expires_in:
-                    expires_at = timezone.now() + timedelta(seconds=expires_in)
-                
-                oauth_token.access_token = access_token
-                oauth_token.refresh_token = refresh_token
-                oauth_token.expires_at = expires_at
-                
-                # Update scopes if they changed during refresh
-                if result.get("scope"):
-                    oauth_token.set_scopes_list(result["scope"].split())
-                
-                oauth_token.save()
-                
-                return {
-                    "access_token": access_token,
-                    "refresh_token": refresh_token,
-                    "expires_at": expires_at,
-                    "token_type": "Bearer",
-                }
-            except Exception as e:
-                # Only disconnect for permanent errors indicating refresh token is invalid
-                error_str = str(e).lower()
-                permanent_errors = ["invalid_grant", "invalid_client", "unauthorized_client"]
-                if any(err in error_str for err in permanent_errors):
-                    logger.warning("Microsoft refresh token invalid for account %s: %s", account.pk, e)
-                    MicrosoftEmailOAuthService.disconnect_account(account)
-                else:
-                    # Log non-fatal errors but don't disconnect
-                    logger.warning("Microsoft token refresh failed (non-fatal) for account %s: %s", account.pk, e)
-                return None
+            return None
 
-        # Return current token
-        return {
-            "access_token": oauth_token.access_token,
-            "refresh_token": oauth_token.refresh_token,
-            "expires_at": oauth_token.expires_at,
-            "token_type": oauth_token.token_type,
+        # Update stored token
+        access_token = result.get("access_token")
+        # Always save the refresh token in case it was updated
+        refresh_token = result.get("refresh_token", oauth_token.refresh_token)
+        expires_in = result.get("expires_in")
+
+        if now is None:
+            now = timezone.now()
+        expires_at = None
+        if expires_in:
+            expires_at = now + timedelta(seconds=expires_in)
+
+        oauth_token.access_token = access_token
+        oauth_token.refresh_token = refresh_token
+        oauth_token.expires_at = expires_at
+        oauth_token.issued_at = now
+
+        # Update scopes if they changed during refresh
+        scopes_changed = bool(result.get("scope")) and oauth_token.set_scopes_list(
+            result["scope"].split()
+        )
+
+        if save:
+            oauth_token.save(update_fields=_refresh_update_fields(scopes_changed))
+
+        credentials = {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "expires_at": expires_at,
+            "token_type": "Bearer",
         }
+        _cache_credentials(_MS_CREDS_CACHE, account.pk, credentials, expires_at)
+        return credentials
+
+    @staticmethod
+    def _refresh_failed(account: Account, error: Exception) -> None:
+        """Log a failed refresh; disconnect only if the refresh token itself is invalid."""
+        if _MICROSOFT_PERMANENT_ERROR_RE.search(str(error)):
+            logger.warning("Microsoft refresh token invalid for account %s: %s", account.pk, error)
+            MicrosoftEmailOAuthService.disconnect_account(account)
+        else:
+            # Log non-fatal errors but don't disconnect
+            logger.warning("Microsoft token refresh failed (non-fatal) for account %s: %s", account.pk, error)
+        return None
+
+    @staticmethod
+    def _do_refresh(account: Account, oauth_token: OAuthToken) -> Optional[dict]:
+        """Refresh the access token and store it. Returns None if the refresh failed."""
+        try:
+            result = MicrosoftEmailOAuthService._request_refresh(oauth_token)
+            return MicrosoftEmailOAuthService._apply_refresh(account, oauth_token, result)
+        except Exception as e:
+            return MicrosoftEmailOAuthService._refresh_failed(account, e)
+
+    @staticmethod
+    def get_valid_credentials(
+        account: Account, oauth_token: Optional[OAuthToken] = None
+    ) -> Optional[dict]:
+        """Get valid OAuth credentials, refreshing if necessary.
+
+        Pass oauth_token if the caller already has it, or load account with
+        select_related("oauth_token"), to avoid a token query per call.
+        """
+        # A disconnected account never has a usable token; skip the token lookup.
+        if not account.is_connected:
+            return None
+
+        cached = _get_cached_credentials(_MS_CREDS_CACHE, account.pk)
+        if cached is not None:
+            return cached
+
+        if oauth_token is None:
+            oauth_token = _fetch_token_row(account)
+        if oauth_token is None:
+            return None
+
+        # The refresh threshold (OAuthToken.refresh_threshold_seconds) is applied
+        # by the refresh_expiring_oauth_tokens periodic task, which refreshes
+        # Microsoft tokens as well. Still refresh inline within the last five
+        # minutes, so a missed or failed periodic refresh never hands out a
+        # token that expires mid-request.
+        expires_soon = (
+            oauth_token.expires_at_epoch is not None
+            and oauth_token.expires_at_epoch - time.time() < _CREDS_CACHE_MIN_REMAINING.total_seconds()
+        )
+        if expires_soon and oauth_token.refresh_token:
+            return _single_flight_refresh(
+                _MS_CREDS_CACHE,
+                account,
+                MicrosoftEmailOAuthService._credentials_dict,
+                MicrosoftEmailOAuthService._do_refresh,
+            )
+
+        # Return current token
+        credentials = MicrosoftEmailOAuthService._credentials_dict(oauth_token)
+        _cache_credentials(_MS_CREDS_CACHE, account.pk, credentials, oauth_token.expires_at)
+        return credentials
 
     @staticmethod
     def disconnect_account(account: Account):
         """Disconnect account and remove OAuth token"""
-        OAuthToken.objects.filter(account=account).delete()
+        # Queryset delete/update: one statement each, no model save() or signals.
+        with transaction.atomic():
+            OAuthToken.objects.filter(account=account).delete()
+            Account.objects.filter(pk=account.pk, is_connected=True).update(is_connected=False)
         account.is_connected = False
-        account.save(update_fields=["is_connected"])
+        account.__dict__.pop("oauth_token_or_none", None)
+        _forget_credentials(_MS_CREDS_CACHE, account.pk)
+
+
+# Providers whose tokens refresh_due_tokens can refresh, by Account.provider.
+TOKEN_SERVICES = {
+    Provider.GMAIL: GmailOAuthService,
+    Provider.MICROSOFT: MicrosoftEmailOAuthService,
+}
+# Token endpoint calls are pure network waits; overlap up to this many.
+REFRESH_MAX_WORKERS = 32
+REFRESH_UPDATE_FIELDS = [
+    "access_token", "refresh_token", "expires_at", "expires_at_epoch", "issued_at", "scopes",
+    "updated_at",
+]
+BULK_UPDATE_BATCH_SIZE = 500
+
+
+def _refresh_update_fields(scopes_changed: bool) -> list:
+    """Columns written after a refresh; scopes only when the granted set changed."""
+    if scopes_changed:
+        return REFRESH_UPDATE_FIELDS
+    return [f for f in REFRESH_UPDATE_FIELDS if f != "scopes"]
+
+
+def refresh_due_tokens(tokens) -> Tuple[int, int]:
+    """
+    Refresh OAuthTokens (with account loaded) concurrently and store them with
+    one bulk_update. Returns (refreshed, failed).
+
+    Only the provider round trips run on the thread pool; results are stored
+    from the calling thread. Callers should hold row locks on the tokens
+    (select_for_update) so that no other worker refreshes them concurrently.
+    """
+    tokens = [t for t in tokens if t.account.provider in TOKEN_SERVICES]
+    if not tokens:
+        return 0, 0
+    updated = []
+    failed = 0
+    scopes_changed = False
+    # Taken before the requests go out, so expiries computed from it err early.
+    now = timezone.now()
+    with ThreadPoolExecutor(max_workers=min(REFRESH_MAX_WORKERS, len(tokens))) as executor:
+        futures = [
+            executor.submit(TOKEN_SERVICES[t.account.provider]._request_refresh, t)
+            for t in tokens
+        ]
+        for oauth_token, future in zip(tokens, futures):
+            account = oauth_token.account
+            service = TOKEN_SERVICES[account.provider]
+            scopes_before = oauth_token.scopes
+            try:
+                credentials = service._apply_refresh(
+                    account, oauth_token, future.result(), save=False, now=now
+                )
+            except Exception as e:
+                credentials = service._refresh_failed(account, e)
+            if credentials is None:
+                failed += 1
+            else:
+                # bulk_update skips save(): apply auto_now and the epoch column here.
+                oauth_token.updated_at = now
+                oauth_token.sync_expires_at_epoch()
+                scopes_changed = scopes_changed or oauth_token.scopes is not scopes_before
+                updated.append(oauth_token)
+    OAuthToken.objects.bulk_update(
+        updated, _refresh_update_fields(scopes_changed), batch_size=BULK_UPDATE_BATCH_SIZE
+    )
+    return len(updated), failed
@@ -0,0 +1,67 @@
+import logging
+import time
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, DurationField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from accounts.models import OAuthToken
+from accounts.services import TOKEN_SERVICES, refresh_due_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _refresh_threshold():
+    """OAuthToken.refresh_threshold_seconds as a database expression."""
+    lifetime = ExpressionWrapper(F("expires_at") - F("issued_at"), output_field=DurationField())
+    return Case(
+        When(
+            issued_at__isnull=False,
+            then=Greatest(
+                ExpressionWrapper(
+                    lifetime * Value(settings.OAUTH_REFRESH_THRESHOLD_RATIO),
+                    output_field=DurationField(),
+                ),
+                Value(timedelta(seconds=60)),
+            ),
+        ),
+        # Tokens saved before issued_at was recorded
+        default=Value(timedelta(seconds=300)),
+        output_field=DurationField(),
+    )
+
+
+@shared_task
+def refresh_expiring_oauth_tokens():
+    """Refresh access tokens that are about to expire, off the request path."""
+    now = timezone.now()
+    with transaction.atomic():
+        # Each token is due once it is past its own threshold, compared in SQL
+        # so that any OAUTH_REFRESH_THRESHOLD_RATIO takes effect.
+        # skip_locked: rows another worker is already refreshing are left to it.
+        tokens = list(
+            OAuthToken.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("account")
+            .alias(
+                refresh_at=ExpressionWrapper(
+                    F("expires_at") - _refresh_threshold(), output_field=DateTimeField()
+                )
+            )
+            .filter(
+                expires_at_epoch__gt=int(time.time()),
+                refresh_at__lte=now,
+                account__is_connected=True,
+                account__provider__in=list(TOKEN_SERVICES),
+            )
+            .exclude(Q(refresh_token__isnull=True) | Q(refresh_token=""))
+        )
+        refreshed, failed = refresh_due_tokens(tokens)
+    if tokens:
+        logger.info(
+            "refresh_expiring_oauth_tokens refreshed=%s failed=%s", refreshed, failed
+        )
+    return {"refreshed": refreshed, "failed": failed}
@@ -0,0 +1,304 @@
+"""
+Tests for account OAuth helpers.
+These run without contacting Google or Microsoft.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Account, OAuthToken, Provider
+from accounts.oauth_redirects import build_oauth_redirect_uri
+from accounts.services import (
+    HTTP_RETRY_AFTER_MAX_SECONDS,
+    _HTTP_RETRY,
+    GmailOAuthService,
+    GoogleOAuthService,
+    MicrosoftEmailOAuthService,
+)
+from accounts.tasks import refresh_expiring_oauth_tokens
+
+
+class BuildOAuthRedirectUriTests(TestCase):
+    """build_oauth_redirect_uri caches its lookups but must follow settings changes."""
+
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+
+    @override_settings(APP_BASE_URL="https://app.example.com", GMAIL_OAUTH_REDIRECT_URI="")
+    def test_uses_app_base_url_and_callback_path(self):
+        uri = build_oauth_redirect_uri(self.request, "gmail_oauth_callback")
+        self.assertTrue(uri.startswith("https://app.example.com/"))
+
+    def test_override_is_picked_up_after_settings_change(self):
+        with override_settings(GMAIL_OAUTH_REDIRECT_URI=""):
+            default_uri = build_oauth_redirect_uri(self.request, "gmail_oauth_callback")
+        with override_settings(GMAIL_OAUTH_REDIRECT_URI="https://fixed.example.com/cb"):
+            override_uri = build_oauth_redirect_uri(self.request, "gmail_oauth_callback")
+        self.assertNotEqual(default_uri, override_uri)
+        self.assertEqual(override_uri, "https://fixed.example.com/cb")
+
+
+class OAuthTokenScopesTests(TestCase):
+    """Scopes are stored as an array and round-trip through the helpers."""
+
+    def test_set_and_get_scopes(self):
+        token = OAuthToken()
+        self.assertEqual(list(token.get_scopes_list()), [])
+        token.set_scopes_list(("a", "b"))
+        self.assertEqual(list(token.get_scopes_list()), ["a", "b"])
+        token.set_scopes_list(None)
+        self.assertEqual(list(token.get_scopes_list()), [])
+
+    def test_set_same_scopes_reports_no_change(self):
+        token = OAuthToken(scopes=["a", "b"])
+        self.assertFalse(token.set_scopes_list(["b", "a"]))
+        self.assertEqual(token.scopes, ["a", "b"])
+        self.assertTrue(token.set_scopes_list(["a"]))
+
+
+class OAuthTokenRefreshThresholdTests(TestCase):
+    """The refresh threshold scales with the token's lifetime."""
+
+    @override_settings(OAUTH_REFRESH_THRESHOLD_RATIO=0.5)
+    def test_threshold_is_fraction_of_lifetime(self):
+        now = timezone.now()
+        short = OAuthToken(issued_at=now, expires_at=now + timedelta(minutes=5))
+        self.assertEqual(short.refresh_threshold_seconds(), 150)
+        self.assertFalse(short.expires_soon())
+        legacy = OAuthToken(expires_at=now + timedelta(minutes=4))
+        self.assertEqual(legacy.refresh_threshold_seconds(), 300)
+        self.assertTrue(legacy.expires_soon())
+
+
+class OAuthTokenExpiresAtEpochTests(TestCase):
+    """save() keeps expires_at_epoch in step with expires_at."""
+
+    def test_save_sets_epoch(self):
+        account = Account.objects.create(provider=Provider.GMAIL, email="epoch@example.com")
+        expires_at = timezone.now() + timedelta(hours=1)
+        token = OAuthToken.objects.create(account=account, access_token="t", expires_at=expires_at)
+        self.assertEqual(token.expires_at_epoch, int(expires_at.timestamp()))
+        token.expires_at = None
+        token.save(update_fields=["expires_at"])
+        token.refresh_from_db()
+        self.assertIsNone(token.expires_at_epoch)
+
+
+class HttpRetryTests(TestCase):
+    """Provider Retry-After headers cannot stall a request for long."""
+
+    def test_retry_after_wait_is_capped(self):
+        response = mock.Mock(headers={"Retry-After": "3600"})
+        # increment() returns a new Retry, as urllib3 does between attempts.
+        retry = _HTTP_RETRY.increment(method="GET", url="/", response=mock.Mock(status=429, headers={}))
+        self.assertEqual(retry.get_retry_after(response), HTTP_RETRY_AFTER_MAX_SECONDS)
+
+
+class OAuthTokenOrNoneTests(TestCase):
+    """Account.oauth_token_or_none replaces try/except around the reverse accessor."""
+
+    def setUp(self):
+        self.account = Account.objects.create(provider=Provider.GMAIL, email="a@example.com")
+
+    def test_returns_none_without_token(self):
+        self.assertIsNone(self.account.oauth_token_or_none)
+
+    def test_uses_select_related_join(self):
+        token = OAuthToken.objects.create(account=self.account, access_token="t")
+        account = Account.objects.select_related("oauth_token").get(pk=self.account.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(account.oauth_token_or_none, token)
+
+
+class SaveTokenTests(TestCase):
+    """save_token upserts the account's single OAuthToken row."""
+
+    def test_second_save_overwrites_existing_row(self):
+        account = Account.objects.create(provider=Provider.GMAIL, email="s@example.com")
+        expiry = timezone.now() + timedelta(hours=1)
+        first = GmailOAuthService.save_token(
+            account, mock.Mock(token="a", refresh_token="r", expiry=expiry, scopes=["s"])
+        )
+        second = GmailOAuthService.save_token(
+            account, mock.Mock(token="b", refresh_token=None, expiry=None, scopes=None)
+        )
+        self.assertEqual(second.pk, first.pk)
+        token = OAuthToken.objects.get(account=account)
+        self.assertEqual((token.access_token, token.refresh_token), ("b", ""))
+        self.assertIsNone(token.expires_at_epoch)
+        self.assertTrue(Account.objects.get(pk=account.pk).is_connected)
+
+
+class RefreshExpiringOAuthTokensTests(TestCase):
+    """The periodic refresh only picks up tokens that are about to expire."""
+
+    def _token(self, email, expires_in, refresh_token="r"):
+        account = Account.objects.create(
+            provider=Provider.GMAIL, email=email, is_connected=True
+        )
+        return OAuthToken.objects.create(
+            account=account,
+            access_token="t",
+            refresh_token=refresh_token,
+            expires_at=timezone.now() + expires_in,
+        )
+
+    def test_refreshes_only_expiring_tokens(self):
+        expiring = self._token("soon@example.com", timedelta(minutes=2))
+        self._token("later@example.com", timedelta(hours=1))
+        self._token("expired@example.com", timedelta(minutes=-1))
+        self._token("norefresh@example.com", timedelta(minutes=2), refresh_token="")
+        refreshed = mock.Mock(
+            token="new", refresh_token=None, expiry=None, scopes=["s"]
+        )
+        with mock.patch.object(
+            GmailOAuthService, "_request_refresh", return_value=refreshed
+        ) as request_refresh:
+            result = refresh_expiring_oauth_tokens()
+        self.assertEqual(result, {"refreshed": 1, "failed": 0})
+        request_refresh.assert_called_once_with(expiring)
+        expiring.refresh_from_db()
+        self.assertEqual(expiring.access_token, "new")
+        self.assertEqual(expiring.scopes, ["s"])
+
+    @override_settings(OAUTH_REFRESH_THRESHOLD_RATIO=0.5)
+    def test_threshold_ratio_sets_the_refresh_window(self):
+        # Half of a one-hour lifetime: due from 30 minutes before expiry.
+        now = timezone.now()
+        due = self._token("due@example.com", timedelta(minutes=20))
+        not_due = self._token("notdue@example.com", timedelta(minutes=40))
+        OAuthToken.objects.filter(pk=due.pk).update(issued_at=now - timedelta(minutes=40))
+        OAuthToken.objects.filter(pk=not_due.pk).update(issued_at=now - timedelta(minutes=20))
+        with mock.patch.object(
+            GmailOAuthService, "_request_refresh", side_effect=OSError("timeout")
+        ) as request_refresh:
+            refresh_expiring_oauth_tokens()
+        request_refresh.assert_called_once_with(due)
+
+    def test_counts_failed_refreshes(self):
+        self._token("soon@example.com", timedelta(minutes=2))
+        with mock.patch.object(GmailOAuthService, "_request_refresh", side_effect=OSError("timeout")):
+            result = refresh_expiring_oauth_tokens()
+        self.assertEqual(result, {"refreshed": 0, "failed": 1})
+
+
+class CredentialsCacheTests(TestCase):
+    """get_valid_credentials serves repeat calls from the per-process cache."""
+
+    def setUp(self):
+        self.account = Account.objects.create(
+            provider=Provider.GMAIL, email="cache@example.com", is_connected=True
+        )
+        OAuthToken.objects.create(
+            account=self.account,
+            access_token="t",
+            refresh_token="r",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def test_second_call_skips_database(self):
+        first = GmailOAuthService.get_valid_credentials(self.account)
+        account = Account.objects.get(pk=self.account.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(GmailOAuthService.get_valid_credentials(account), first)
+
+    def test_token_fetch_loads_only_credential_columns(self):
+        account = Account.objects.get(pk=self.account.pk)
+        with self.assertNumQueries(1):
+            GmailOAuthService.get_valid_credentials(account)
+        token = account.oauth_token_or_none
+        self.assertEqual(token.get_deferred_fields(), {"created_at"})
+
+    def test_disconnect_clears_cache(self):
+        GmailOAuthService.get_valid_credentials(self.account)
+        GmailOAuthService.disconnect_account(self.account)
+        account = Account.objects.get(pk=self.account.pk)
+        self.assertIsNone(GmailOAuthService.get_valid_credentials(account))
+
+    @override_settings(OAUTH_REFRESH_THRESHOLD_RATIO=0.5)
+    def test_token_without_refresh_token_is_kept_until_its_last_minutes(self):
+        # Inside the ratio window (20 of 60 minutes left), but far from expiry.
+        now = timezone.now()
+        OAuthToken.objects.filter(account=self.account).update(
+            refresh_token="",
+            issued_at=now - timedelta(minutes=40),
+            expires_at=now + timedelta(minutes=20),
+            expires_at_epoch=int((now + timedelta(minutes=20)).timestamp()),
+        )
+        account = Account.objects.get(pk=self.account.pk)
+        self.assertIsNotNone(GmailOAuthService.get_valid_credentials(account))
+        account.refresh_from_db()
+        self.assertTrue(account.is_connected)
+
+    def test_refresh_skipped_when_another_worker_refreshed(self):
+        stale = Account.objects.select_related("oauth_token").get(pk=self.account.pk)
+        stale.oauth_token.expires_at = timezone.now() - timedelta(minutes=1)
+        with mock.patch.object(GmailOAuthService, "_do_refresh") as do_refresh:
+            credentials = GmailOAuthService.get_valid_credentials(stale)
+        do_refresh.assert_not_called()
+        self.assertEqual(credentials.token, "t")
+
+
+class MicrosoftCredentialsTests(TestCase):
+    """Microsoft credentials are refreshed inline shortly before they expire."""
+
+    def _account(self, expires_in):
+        account = Account.objects.create(
+            provider=Provider.MICROSOFT, email="ms@example.com", is_connected=True
+        )
+        OAuthToken.objects.create(
+            account=account,
+            access_token="t",
+            refresh_token="r",
+            expires_at=timezone.now() + expires_in,
+        )
+        return Account.objects.get(pk=account.pk)
+
+    def test_refreshes_within_five_minutes_of_expiry(self):
+        account = self._account(timedelta(minutes=2))
+        with mock.patch.object(
+            MicrosoftEmailOAuthService, "_do_refresh", return_value={"access_token": "new"}
+        ) as do_refresh:
+            credentials = MicrosoftEmailOAuthService.get_valid_credentials(account)
+        do_refresh.assert_called_once()
+        self.assertEqual(credentials, {"access_token": "new"})
+
+    def test_leaves_longer_lived_tokens_to_the_periodic_refresh(self):
+        account = self._account(timedelta(minutes=30))
+        with mock.patch.object(MicrosoftEmailOAuthService, "_do_refresh") as do_refresh:
+            MicrosoftEmailOAuthService.get_valid_credentials(account)
+        do_refresh.assert_not_called()
+
+
+class AccountOAuthCallbackTests(TestCase):
+    """The settings-page callbacks link the mailbox, store its token and queue onboarding."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("u", "u@example.com", "pw")
+        self.client.force_login(self.user)
+
+    def test_gmail_callback_creates_account_and_token(self):
+        credentials = mock.Mock(
+            token="t", refresh_token="r", expiry=None, scopes=list(GmailOAuthService.SCOPES)
+        )
+        with mock.patch.object(
+            GmailOAuthService, "exchange_code_for_token", return_value=credentials
+        ), mock.patch.object(
+            GoogleOAuthService, "get_user_info", return_value={"email": "box@example.com"}
+        ), mock.patch(
+            "accounts.views.trigger_sync_after_connect", return_value=(True, None)
+        ) as trigger:
+            response = self.client.get(reverse("gmail_oauth_callback"), {"code": "c"})
+        self.assertRedirects(
+            response, f"{reverse('settings')}?tab=accounts", fetch_redirect_response=False
+        )
+        account = Account.objects.get(provider=Provider.GMAIL, email="box@example.com")
+        self.assertTrue(account.is_connected)
+        self.assertTrue(account.users.filter(pk=self.user.pk).exists())
+        self.assertEqual(OAuthToken.objects.get(account=account).access_token, "t")
+        trigger.assert_called_once_with(account, setup_automation=True)
+
@@ -1,8 +1,12 @@
 import logging
-import traceback
+import re
+from functools import lru_cache
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from rest_framework import viewsets
@@ -16,12 +20,119 @@ from .services import (
     MicrosoftEmailOAuthService,
     MicrosoftOAuthService,
 )
-from automation.utils import setup_account_automation
-from mail.onboarding import trigger_sync_after_connect
+from mail.onboarding import queue_account_setup, trigger_sync_after_connect
+from mail.sync_status import claim_sync_request, release_sync_request
 from mail.tasks import sync_account_emails
 
 logger = logging.getLogger(__name__)
 
+# Error-message classifiers for the callbacks; case-insensitive, one pass each.
+_INVALID_GRANT_RE = re.compile(r"invalid[_ ]grant", re.IGNORECASE)
+_OAUTH_SCOPE_OR_GRANT_ERROR_RE = re.compile(r"scope|invalid[_ ]grant", re.IGNORECASE)
+
+# Columns the disconnect/sync views read; skips signature_html and writing_style.
+ACCOUNT_ACTION_FIELDS = ("id", "email", "provider", "is_connected")
+
+
+@lru_cache(maxsize=1)
+def _settings_accounts_url() -> str:
+    """The Settings page's accounts tab; every view here redirects to it."""
+    return f"{reverse('settings')}?tab=accounts"
+
+
+@receiver(setting_changed)
+def _clear_settings_accounts_url(**kwargs):
+    # The URLconf is fixed in production; tests may override it.
+    _settings_accounts_url.cache_clear()
+
+
+def _oauth_fail(request, message: str):
+    """Flash an error and send the user back to the accounts tab."""
+    messages.error(request, message)
+    return redirect(_settings_accounts_url())
+
+
+def _google_account_email(credentials):
+    # userinfo endpoint, as on the login path; no Gmail client build
+    return GoogleOAuthService.get_user_info(credentials).get("email")
+
+
+def _microsoft_account_email(token_dict):
+    # Microsoft Graph returns 'mail' or 'userPrincipalName' for the address
+    user_info = MicrosoftOAuthService.get_user_info(token_dict)
+    return user_info.get("mail") or user_info.get("userPrincipalName")
+
+
+def _complete_oauth_connect(
+    request, provider, token_service, token, get_email, account_label, email_source
+):
+    """
+    Shared tail of the account OAuth callbacks, once the code has been exchanged:
+    look up the mailbox address, link the account to the user, store the token
+    and queue onboarding. token is whatever token_service.save_token() accepts;
+    get_email(token) returns the address (or None).
+    """
+    try:
+        try:
+            email = get_email(token)
+        except Exception as e:
+            logger.exception("Could not retrieve email from %s", email_source)
+            return _oauth_fail(
+                request,
+                f"Could not retrieve email address from {email_source}: {e}. Please try connecting again.",
+            )
+        if not email:
+            return _oauth_fail(request, f"Could not retrieve email address from {email_source}.")
+
+        # Account, user link and token commit together; the row lock keeps a
+        # concurrent callback for the same address from interleaving.
+        with transaction.atomic():
+            account, created = Account.objects.select_for_update().get_or_create(
+                provider=provider,
+                email=email,
+                defaults={"sync_enabled": True},
+            )
+            # add() is a single INSERT ... ON CONFLICT DO NOTHING
+            if request.user.is_authenticated:
+                account.users.add(request.user)
+            token_service.save_token(account, token)
+
+        # New accounts get recommended labels and actions, set up in the worker
+        # chain ahead of the first sync.
+        if created:
+            messages.success(
+                request,
+                f"Successfully connected new {account_label} account: {account.email}. "
+                "Setting up recommended labels and actions."
+            )
+        else:
+            messages.info(
+                request, f"{account_label} account {account.email} was already connected."
+            )
+
+        ok, _ = trigger_sync_after_connect(account, setup_automation=created)
+        if ok:
+            messages.info(request, f"Email sync started for {account.email}. Emails will appear shortly.")
+        else:
+            messages.warning(request, "Account connected but email sync failed to start. You can manually sync from the account page.")
+        return redirect(_settings_accounts_url())
+    except Exception as e:
+        error_msg = str(e)
+        # The traceback is formatted by the log handler, only if the record is emitted.
+        logger.exception("OAuth callback error for %s account", provider)
+        if _OAUTH_SCOPE_OR_GRANT_ERROR_RE.search(error_msg):
+            messages.error(request, f"OAuth scope error: {error_msg}. Please try connecting again.")
+        else:
+            messages.error(request, f"Error connecting account: {error_msg}")
+        try:
+            return redirect(_settings_accounts_url())
+        except Exception as redirect_error:
+            logger.error("Redirect error: %s", redirect_error)
+            return redirect('/settings?tab=accounts')
+    finally:
+        request.session.pop("oauth_state", None)
+        request.session.pop("oauth_account_id", None)
+
 
 class AccountViewSet(viewsets.ModelViewSet):
     queryset = Account.objects.all().order_by("provider", "email")
@@ -52,12 +163,12 @@ def account_connect_gmail(request):
         account, created = Account.objects.get_or_create(
             provider=Provider.GMAIL, email=email, defaults={"sync_enabled": True}
         )
-        # Link account to user
-        if request.user.is_authenticated and request.user not in account.users.all():
+        # Link account to user; add() is a single INSERT ... ON CONFLICT DO NOTHING
+        if request.user.is_authenticated:
             account.users.add(request.user)
-        # Set up recommended labels and actions for new accounts
+        # Set up recommended labels and actions for new accounts (in a worker)
         if created:
-            setup_account_automation(account)
+            queue_account_setup(account)
 
     # Get authorization URL
     redirect_uri = build_oauth_redirect_uri(request, "gmail_oauth_callback")
@@ -76,8 +187,7 @@ def account_connect_gmail(request):
             request.session.pop("oauth_account_id", None)
         return redirect(auth_url)
     except Exception as e:
-        messages.error(request, f"Error initiating OAuth: {str(e)}")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, f"Error initiating OAuth: {str(e)}")
 
 
 @login_required
@@ -87,144 +197,38 @@ def account_gmail_oauth_callback(request):
     error = request.GET.get("error")
 
     if error:
-        messages.error(request, f"OAuth error: {error}")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, f"OAuth error: {error}")
 
     if not code:
-        messages.error(request, "No authorization code received.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, "No authorization code received.")
 
     # Exchange code for token (pass PKCE code_verifier from session)
     redirect_uri = build_oauth_redirect_uri(request, "gmail_oauth_callback")
     code_verifier = request.session.pop("oauth_code_verifier", None)
-    credentials = None
-
     try:
         credentials = GmailOAuthService.exchange_code_for_token(
             code, redirect_uri, code_verifier=code_verifier
         )
-    except Warning as w:
-        # OAuth scope mismatch warnings - Google may add 'openid' scope automatically
-        # These are usually harmless - try to get credentials anyway
-        error_msg = str(w)
-        if "scope" in error_msg.lower():
-            # Log the warning but try to continue - scope mismatches are often harmless
-            logger.warning("OAuth scope warning (attempting to continue): %s", error_msg)
-            # Try to create a new flow and fetch token, ignoring the warning
-            try:
-                # Use the scopes that Google actually granted (including openid)
-                all_scopes = GmailOAuthService.SCOPES
-                flow = GoogleOAuthService.get_oauth_flow(
-                    redirect_uri, all_scopes, code_verifier=code_verifier
-                )
-                import warnings
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    flow.fetch_token(code=code)
-                credentials = flow.credentials
-            except Exception as e2:
-                error_msg2 = str(e2)
-                if "invalid_grant" in error_msg2.lower():
-                    messages.error(
-                        request,
-                        "The authorization code has expired or has already been used. Please try connecting your Gmail account again.",
-                    )
-                else:
-                    messages.error(
-                        request,
-                        f"OAuth error after scope warning: {error_msg2}. Please try connecting again.",
-                    )
-                return redirect(f"{reverse('settings')}?tab=accounts")
-        else:
-            # Non-scope warnings should be treated as errors
-            messages.error(request, f"OAuth warning: {error_msg}")
-            return redirect(f"{reverse('settings')}?tab=accounts")
     except Exception as e:
-        # Catch any other exceptions (like InvalidGrantError)
+        # e.g. InvalidGrantError. Scope changes no longer raise: services sets
+        # OAUTHLIB_RELAX_TOKEN_SCOPE.
         error_msg = str(e)
-        if "invalid_grant" in error_msg.lower() or "InvalidGrantError" in str(type(e).__name__):
-            messages.error(
+        if _INVALID_GRANT_RE.search(error_msg) or type(e).__name__ == "InvalidGrantError":
+            return _oauth_fail(
                 request,
                 "The authorization code has expired or has already been used. Please try connecting your Gmail account again.",
             )
-        else:
-            messages.error(
-                request,
-                f"OAuth error: {error_msg}. Please try connecting again.",
-            )
-        return redirect(f"{reverse('settings')}?tab=accounts")
-    
-    if not credentials:
-        messages.error(request, "Failed to obtain OAuth credentials.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
-    
-    try:
-        # Get email from userinfo API (same as login path; single place, no Gmail client build)
-        user_info = GoogleOAuthService.get_user_info(credentials)
-        email = user_info.get("email")
-        if not email:
-            messages.error(request, "Could not retrieve email address from Google.")
-            return redirect(f"{reverse('settings')}?tab=accounts")
-    except Exception as e:
-        logger.error("Could not retrieve email from Google userinfo: %s\n%s", e, traceback.format_exc())
-        messages.error(
-            request,
-            f"Could not retrieve email address from Google: {e}. Please try connecting again.",
-        )
-        return redirect(f"{reverse('settings')}?tab=accounts")
-    
-    try:
-        # Get or create account with the email from OAuth
-        account, created = Account.objects.get_or_create(
-            provider=Provider.GMAIL, 
-            email=email, 
-            defaults={"sync_enabled": True}
-        )
-        
-        # Link account to user
-        if request.user.is_authenticated and request.user not in account.users.all():
-            account.users.add(request.user)
-        
-        # Save the OAuth token
-        GmailOAuthService.save_token(account, credentials)
-        
-        # Set up recommended labels and actions for new accounts
-        if created:
-            from automation.utils import setup_account_automation
-            setup_result = setup_account_automation(account)
-            messages.success(
-                request, 
-                f"Successfully connected new Gmail account: {account.email}. "
-                f"Created {setup_result['labels']['created']} labels and {setup_result['actions']['created']} actions."
-            )
-        else:
-            messages.info(
-                request, f"Gmail account {account.email} was already connected."
-            )
-        
-        ok, _ = trigger_sync_after_connect(account)
-        if ok:
-            messages.info(request, f"Email sync started for {account.email}. Emails will appear shortly.")
-        else:
-            messages.warning(request, "Account connected but email sync failed to start. You can manually sync from the account page.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
-    except Exception as e:
-        error_msg = str(e)
-        error_traceback = traceback.format_exc()
-        logger.error("OAuth callback error: %s\n%s", error_msg, error_traceback)
-        if "scope" in error_msg.lower() or "invalid_grant" in error_msg.lower():
-            messages.error(request, f"OAuth scope error: {error_msg}. Please try connecting again.")
-        else:
-            messages.error(request, f"Error connecting account: {error_msg}")
-        try:
-            settings_url = reverse('settings')
-            return redirect(f"{settings_url}?tab=accounts")
-        except Exception as redirect_error:
-            logger.error("Redirect error: %s", redirect_error)
-            return redirect('/settings?tab=accounts')
-    finally:
-        request.session.pop("oauth_state", None)
-        request.session.pop("oauth_account_id", None)
+        return _oauth_fail(request, f"OAuth error: {error_msg}. Please try connecting again.")
+
+    return _complete_oauth_connect(
+        request,
+        Provider.GMAIL,
+        GmailOAuthService,
+        credentials,
+        _google_account_email,
+        account_label="Gmail",
+        email_source="Google",
+    )
 
 
 @login_required
@@ -251,12 +255,12 @@ def account_connect_microsoft(request):
         account, created = Account.objects.get_or_create(
             provider=Provider.MICROSOFT, email=email, defaults={"sync_enabled": True}
         )
-        # Link account to user
-        if request.user.is_authenticated and request.user not in account.users.all():
+        # Link account to user; add() is a single INSERT ... ON CONFLICT DO NOTHING
+        if request.user.is_authenticated:
             account.users.add(request.user)
-        # Set up recommended labels and actions for new accounts
+        # Set up recommended labels and actions for new accounts (in a worker)
         if created:
-            setup_account_automation(account)
+            queue_account_setup(account)
 
     # Get authorization URL
     redirect_uri = build_oauth_redirect_uri(request, "microsoft_email_oauth_callback")
@@ -271,8 +275,7 @@ def account_connect_microsoft(request):
             request.session.pop("oauth_account_id", None)
         return redirect(auth_url)
     except Exception as e:
-        messages.error(request, f"Error initiating OAuth: {str(e)}")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, f"Error initiating OAuth: {str(e)}")
 
 
 @login_required
@@ -283,102 +286,35 @@ def account_microsoft_oauth_callback(request):
     state = request.GET.get("state")
 
     if error:
-        messages.error(request, f"OAuth error: {error}")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, f"OAuth error: {error}")
 
     if not code:
-        messages.error(request, "No authorization code received.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, "No authorization code received.")
 
     # Verify state
     session_state = request.session.get("oauth_state")
     if not session_state or state != session_state:
-        messages.error(request, "Invalid OAuth state.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, "Invalid OAuth state.")
 
     # Exchange code for token
     redirect_uri = build_oauth_redirect_uri(request, "microsoft_email_oauth_callback")
-    token_dict = None
-    
     try:
         token_dict = MicrosoftEmailOAuthService.exchange_code_for_token(code, redirect_uri)
     except Exception as e:
-        messages.error(request, f"OAuth error: {str(e)}. Please try connecting again.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, f"OAuth error: {str(e)}. Please try connecting again.")
     
     if not token_dict:
-        messages.error(request, "Failed to obtain OAuth credentials.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return _oauth_fail(request, "Failed to obtain OAuth credentials.")
     
-    try:
-        # Get email from Microsoft Graph API
-        email = None
-        try:
-            user_info = MicrosoftOAuthService.get_user_info(token_dict)
-            email = user_info.get("mail") or user_info.get("userPrincipalName")
-        except Exception as e:
-            import traceback
-            logger.error("Microsoft Graph API error: %s\n%s", e, traceback.format_exc())
-            messages.error(
-                request, 
-                f"Could not retrieve email address from Microsoft: {str(e)}. Please try connecting again."
-            )
-            return redirect(f"{reverse('settings')}?tab=accounts")
-        
-        if not email:
-            messages.error(request, "Could not retrieve email address from Microsoft.")
-            return redirect(f"{reverse('settings')}?tab=accounts")
-        
-        # Get or create account with the email from OAuth
-        account, created = Account.objects.get_or_create(
-            provider=Provider.MICROSOFT, 
-            email=email, 
-            defaults={"sync_enabled": True}
-        )
-        
-        # Link account to user
-        if request.user.is_authenticated and request.user not in account.users.all():
-            account.users.add(request.user)
-        
-        # Save the OAuth token
-        MicrosoftEmailOAuthService.save_token(account, token_dict)
-        
-        # Set up recommended labels and actions for new accounts
-        if created:
-            setup_result = setup_account_automation(account)
-            messages.success(
-                request, 
-                f"Successfully connected new Microsoft account: {account.email}. "
-                f"Created {setup_result['labels']['created']} labels and {setup_result['actions']['created']} actions."
-            )
-        else:
-            messages.info(
-                request, f"Microsoft account {account.email} was already connected."
-            )
-        
-        ok, _ = trigger_sync_after_connect(account)
-        if ok:
-            messages.info(request, f"Email sync started for {account.email}. Emails will appear shortly.")
-        else:
-            messages.warning(request, "Account connected but email sync failed to start. You can manually sync from the account page.")
-        return redirect(f"{reverse('settings')}?tab=accounts")
-    except Exception as e:
-        error_msg = str(e)
-        error_traceback = traceback.format_exc()
-        logger.error("OAuth callback error: %s\n%s", error_msg, error_traceback)
-        if "scope" in error_msg.lower() or "invalid_grant" in error_msg.lower():
-            messages.error(request, f"OAuth scope error: {error_msg}. Please try connecting again.")
-        else:
-            messages.error(request, f"Error connecting account: {error_msg}")
-        try:
-            settings_url = reverse('settings')
-            return redirect(f"{settings_url}?tab=accounts")
-        except Exception as redirect_error:
-            logger.error("Redirect error: %s", redirect_error)
-            return redirect('/settings?tab=accounts')
-    finally:
-        request.session.pop("oauth_state", None)
-        request.session.pop("oauth_account_id", None)
+    return _complete_oauth_connect(
+        request,
+        Provider.MICROSOFT,
+        MicrosoftEmailOAuthService,
+        token_dict,
+        _microsoft_account_email,
+        account_label="Microsoft",
+        email_source="Microsoft",
+    )
 
 
 @login_required
@@ -386,7 +322,7 @@ def account_disconnect(request, pk):
     """Disconnect an account"""
     if request.method == "POST":
         try:
-            account = Account.objects.get(pk=pk, users=request.user)
+            account = Account.objects.only(*ACCOUNT_ACTION_FIELDS).get(pk=pk, users=request.user)
             if account.provider == Provider.GMAIL:
                 GmailOAuthService.disconnect_account(account)
             elif account.provider == Provider.MICROSOFT:
@@ -398,7 +334,7 @@ def account_disconnect(request, pk):
             messages.error(request, f"Error disconnecting: {str(e)}")
 
     if request.GET.get("from") == "settings" or "settings" in (request.headers.get("Referer") or ""):
-        return redirect(f"{reverse('settings')}?tab=accounts")
+        return redirect(_settings_accounts_url())
     return redirect("account_detail", pk=pk)
 
 
@@ -407,11 +343,18 @@ def account_sync(request, pk):
     """Manually trigger email sync for an account"""
     if request.method == "POST":
         try:
-            account = Account.objects.get(pk=pk)
+            account = Account.objects.only(*ACCOUNT_ACTION_FIELDS).get(pk=pk)
             if not account.is_connected:
                 messages.error(request, "Account is not connected.")
+            elif not claim_sync_request(account.pk):
+                messages.info(request, f"Sync already started for {account.email}.")
             else:
-                sync_account_emails.delay(account.pk)
+                try:
+                    sync_account_emails.delay(account.pk)
+                except Exception:
+                    # Not queued: let the next click try again.
+                    release_sync_request(account.pk)
+                    raise
                 messages.success(
                     request, f"Sync started for {account.email}. Emails will appear shortly."
                 )
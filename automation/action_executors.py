@@ -3,13 +3,15 @@ Action executors - functions that execute different action types.
 These are called by the MCP orchestrator when actions are triggered.
 """
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
-from automation.models import Action, Label, EmailLabel
-from automation.services import OpenAIClient
+from django.conf import settings
+from django.db import transaction
+
+from automation.models import Action, Label, EmailLabel, QueuedDraftReply
+from automation.services import OPENAI_BATCH_MAX_REQUESTS, OpenAIClient
 from jobs.models import Job, Task, TaskStatus, JobStatus
 from mail.models import Draft, EmailMessage, EmailThread
-from mail.services import GmailService, MicrosoftService
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
@@ -17,6 +19,29 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# create_task priority keywords, checked in order; plain substring matches, so
+# "high priority" is 5 and "highest" is 4.
+TASK_PRIORITY_KEYWORDS = (
+    (re.compile(r"priority|urgent", re.IGNORECASE), 5),
+    (re.compile(r"high", re.IGNORECASE), 4),
+    (re.compile(r"medium", re.IGNORECASE), 3),
+)
+# set_priority: an explicit "priority: N" in the (lowercased) instructions.
+SET_PRIORITY_RE = re.compile(r'\b(?:priority|priority level|set priority)\s*:?\s*(\d+)\b')
+
+# Relations the executors read from the email; load them with
+# prefetch_for_actions so each access doesn't issue its own query.
+ACTION_EMAIL_RELATED = ("account", "thread")
+
+# Longer bodies are cut before drafting; past this the tail is mostly quoted
+# history and only adds prompt tokens.
+REPLY_CONTEXT_MAX_BODY_CHARS = 16000
+
+
+def prefetch_for_actions(queryset):
+    """Return an EmailMessage queryset with the relations executors use joined in."""
+    return queryset.select_related(*ACTION_EMAIL_RELATED)
+
 
 def execute_action(
     action: Action,
@@ -29,7 +54,7 @@ def execute_action(
     
     Args:
         action: The Action to execute
-        email: The EmailMessage context
+        email: The EmailMessage context (load it via prefetch_for_actions)
         client: OpenAI client for AI operations
         context: Additional context from previous actions
         
@@ -39,48 +64,17 @@ def execute_action(
     context = context or {}
     function = action.function
     
+    executor = ACTION_EXECUTORS.get(function)
+    if executor is None:
+        logger.warning("Unknown action function: %s", function)
+        return {
+            "success": False,
+            "message": f"Unknown action function: {function}",
+            "data": None
+        }
+
     try:
-        if function == "draft_reply":
-            return execute_draft_reply(action, email, client, context)
-        elif function == "send_reply":
-            return execute_send_reply(action, email, client, context)
-        elif function == "create_task":
-            return execute_create_task(action, email, client, context)
-        elif function == "notify":
-            return execute_notify(action, email, client, context)
-        elif function == "schedule":
-            return execute_schedule(action, email, client, context)
-        elif function == "forward_email":
-            return execute_forward_email(action, email, client, context)
-        elif function == "archive_email":
-            return execute_archive_email(action, email, client, context)
-        elif function == "mark_as_spam":
-            return execute_mark_as_spam(action, email, client, context)
-        elif function == "delete_email":
-            return execute_delete_email(action, email, client, context)
-        elif function == "add_label":
-            return execute_add_label(action, email, client, context)
-        elif function == "remove_label":
-            return execute_remove_label(action, email, client, context)
-        elif function == "create_job":
-            return execute_create_job(action, email, client, context)
-        elif function == "extract_information":
-            return execute_extract_information(action, email, client, context)
-        elif function == "set_priority":
-            return execute_set_priority(action, email, client, context)
-        elif function == "mark_as_read":
-            return execute_mark_as_read(action, email, client, context)
-        elif function == "create_reminder":
-            return execute_create_reminder(action, email, client, context)
-        elif function == "respond_to_calendar_invite":
-            return execute_respond_to_calendar_invite(action, email, client, context)
-        else:
-            logger.warning(f"Unknown action function: {function}")
-            return {
-                "success": False,
-                "message": f"Unknown action function: {function}",
-                "data": None
-            }
+        return executor(action, email, client, context)
     except Exception as e:
         logger.error(f"Error executing action {action.name}: {e}", exc_info=True)
         return {
@@ -90,34 +84,32 @@ def execute_action(
         }
 
 
-def execute_draft_reply(
-    action: Action,
-    email: EmailMessage,
-    client: OpenAIClient,
-    context: Dict[str, Any]
-) -> Dict[str, Any]:
-    """Create a draft email reply"""
-    instructions = action.instructions or action.name
-    email_context = f"Subject: {email.subject}\nFrom: {email.from_address}\nBody:\n{email.body_html}"
-    
-    # Include account writing style if available
-    if email.account.writing_style:
-        instructions = f"{instructions}\n\nWriting style: {email.account.writing_style}"
-    
-    html_body = client.draft_reply(instructions, email_context)
-    
-    # Append signature if available
-    if email.account.signature_html:
+def reply_context(email: EmailMessage) -> str:
+    """The email as reply-drafting context: plain-text body, capped at REPLY_CONTEXT_MAX_BODY_CHARS."""
+    return (
+        f"Subject: {email.subject}\nFrom: {email.from_address}\n"
+        f"Body:\n{email.body_text[:REPLY_CONTEXT_MAX_BODY_CHARS]}"
+    )
+
+
+def _with_signature(account, html_body: str) -> str:
+    if account.signature_html:
         separator = '<div style="margin-top: 20px; padding-top: 20px; border-top: 1px solid #e5e7eb;"></div>'
-        html_body = html_body + separator + email.account.signature_html
-    
-    draft = Draft.objects.create(
+        html_body = html_body + separator + account.signature_html
+    return html_body
+
+
+def _build_reply_draft(email: EmailMessage, html_body: str) -> Draft:
+    """Return an unsaved reply Draft for email, with the account signature appended."""
+    return Draft(
         account=email.account,
         email_message=email,
         subject=f"Re: {email.subject or 'your message'}",
-        body_html=html_body,
+        body_html=_with_signature(email.account, html_body),
     )
-    
+
+
+def _draft_created_result(draft: Draft) -> Dict[str, Any]:
     return {
         "success": True,
         "message": f"Draft reply created (ID: {draft.pk})",
@@ -125,33 +117,140 @@ def execute_draft_reply(
     }
 
 
-def execute_create_task(
+def execute_draft_reply(
     action: Action,
     email: EmailMessage,
     client: OpenAIClient,
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
-    """Create a task from the email (uses same consolidation as process_email)."""
-    from automation.task_from_email import ensure_task_for_email
+    """Create a draft email reply"""
+    if settings.OPENAI_BATCH_DRAFT_REPLIES and client.client:
+        return queue_draft_reply(action, email, client)
+    instructions = action.instructions or action.name
+    email_context = reply_context(email)
+    html_body = client.draft_reply(instructions, email_context, writing_style=email.account.writing_style)
+    draft = _build_reply_draft(email, html_body)
+    draft.save()
+    return _draft_created_result(draft)
+
+
+def queue_draft_reply(
+    action: Action,
+    email: EmailMessage,
+    client: OpenAIClient,
+) -> Dict[str, Any]:
+    """
+    Queue a draft reply for the OpenAI Batch API (half price, results within
+    24 hours) instead of waiting on it.
+
+    submit_queued_draft_replies sends everything queued in one batch job, and
+    collect_draft_batch_results creates the Draft once the reply is back.
+    """
+    queued = QueuedDraftReply.objects.create(
+        email_message=email,
+        request_body=client.draft_reply_request(
+            action.instructions or action.name,
+            reply_context(email),
+            writing_style=email.account.writing_style,
+        ),
+    )
+    return {
+        "success": True,
+        "message": f"Draft reply queued for the OpenAI Batch API (ID: {queued.pk})",
+        "data": {"queued_draft_reply_id": queued.pk},
+    }
+
+
+def submit_queued_draft_replies(client: OpenAIClient) -> int:
+    """
+    Submit queued draft replies as one Batch API job (up to
+    OPENAI_BATCH_MAX_REQUESTS; the rest wait for the next run). Returns how
+    many were submitted.
+    """
+    if not client.client:
+        return 0
+    with transaction.atomic():
+        # skip_locked: rows another worker is already submitting are left to it.
+        requests = dict(
+            QueuedDraftReply.objects.select_for_update(skip_locked=True)
+            .filter(openai_batch_id__isnull=True)
+            .order_by("pk")
+            .values_list("pk", "request_body")[:OPENAI_BATCH_MAX_REQUESTS]
+        )
+        if not requests:
+            return 0
+        batch_id = client.submit_batch({f"reply:{pk}": body for pk, body in requests.items()})
+        QueuedDraftReply.objects.filter(pk__in=requests).update(openai_batch_id=batch_id)
+    return len(requests)
+
+
+def collect_draft_batch_results(client: OpenAIClient) -> Tuple[int, int]:
+    """
+    Create the drafts of queued replies whose OpenAI batch has finished.
+    Returns (drafted, failed).
 
+    Replies missing from a batch that ended early (failed, expired or
+    cancelled) are drafted with a direct request instead.
+    """
+    drafted = failed = 0
+    if not client.client:
+        return drafted, failed
+    batch_ids = (
+        QueuedDraftReply.objects.filter(openai_batch_id__isnull=False)
+        .values_list("openai_batch_id", flat=True)
+        .distinct()
+    )
+    for batch_id in list(batch_ids):
+        try:
+            results = client.batch_results(batch_id)
+        except Exception as e:
+            logger.error(f"Error retrieving OpenAI batch {batch_id}: {e}", exc_info=True)
+            continue
+        if results is None:
+            continue
+        queued = QueuedDraftReply.objects.filter(openai_batch_id=batch_id).select_related(
+            "email_message__account"
+        )
+        drafts = []
+        for item in queued:
+            content = results.get(f"reply:{item.pk}")
+            if content is None:
+                try:
+                    content = client.draft_reply_from_request(item.request_body)
+                except Exception as e:
+                    logger.error(
+                        f"Error drafting reply {item.pk} after OpenAI batch {batch_id} ended: {e}",
+                        exc_info=True,
+                    )
+                    failed += 1
+                    continue
+            drafts.append(_build_reply_draft(item.email_message, content))
+        with transaction.atomic():
+            Draft.objects.bulk_create(drafts)
+            QueuedDraftReply.objects.filter(openai_batch_id=batch_id).delete()
+        drafted += len(drafts)
+    return drafted, failed
+
+
+def _task_classification(action: Action, email: EmailMessage) -> Dict[str, Any]:
+    """Task fields for create_task, in the shape ensure_task_for_email expects."""
     instructions = action.instructions or "Create a task for this email"
     title = email.subject or f"Task for email from {email.from_address}"
     description = f"Email from {email.from_name or email.from_address}: {email.subject}"
-    priority = 1
-    if "priority" in instructions.lower() or "urgent" in instructions.lower():
-        priority = 5
-    elif "high" in instructions.lower():
-        priority = 4
-    elif "medium" in instructions.lower():
-        priority = 3
+    priority = next(
+        (level for pattern, level in TASK_PRIORITY_KEYWORDS if pattern.search(instructions)),
+        1,
+    )
 
-    classification = {
+    return {
         "task_title": title[:255],
         "task_description": description,
         "priority": priority,
         "due_at": None,
     }
-    task = ensure_task_for_email(email, classification)
+
+
+def _task_created_result(task: Task) -> Dict[str, Any]:
     return {
         "success": True,
         "message": f"Task created (ID: {task.pk})",
@@ -159,6 +258,19 @@ def execute_create_task(
     }
 
 
+def execute_create_task(
+    action: Action,
+    email: EmailMessage,
+    client: OpenAIClient,
+    context: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Create a task from the email (uses same consolidation as process_email)."""
+    from automation.task_from_email import ensure_task_for_email
+
+    task = ensure_task_for_email(email, _task_classification(action, email))
+    return _task_created_result(task)
+
+
 def execute_notify(
     action: Action,
     email: EmailMessage,
@@ -198,6 +310,8 @@ def execute_send_reply(
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
     """Send an immediate email reply (not just a draft)"""
+    from mail.services import GmailService, MicrosoftService
+
     if not email.account.is_connected:
         return {
             "success": False,
@@ -206,14 +320,10 @@ def execute_send_reply(
         }
     
     instructions = action.instructions or action.name
-    email_context = f"Subject: {email.subject}\nFrom: {email.from_address}\nBody:\n{email.body_html}"
-    
-    # Include account writing style if available
-    if email.account.writing_style:
-        instructions = f"{instructions}\n\nWriting style: {email.account.writing_style}"
+    email_context = reply_context(email)
     
     # Generate reply body using AI
-    html_body = client.draft_reply(instructions, email_context)
+    html_body = client.draft_reply(instructions, email_context, writing_style=email.account.writing_style)
     
     provider_services = {
         "gmail": GmailService(),
@@ -268,6 +378,8 @@ def execute_forward_email(
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
     """Forward email to specified recipients"""
+    from mail.services import GmailService
+
     if not email.account.is_connected:
         return {
             "success": False,
@@ -336,6 +448,8 @@ def execute_archive_email(
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
     """Archive email (remove from inbox)"""
+    from mail.services import GmailService
+
     if not email.account.is_connected:
         return {
             "success": False,
@@ -368,6 +482,8 @@ def execute_mark_as_spam(
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
     """Mark email as spam"""
+    from mail.services import GmailService
+
     if not email.account.is_connected:
         return {
             "success": False,
@@ -400,6 +516,8 @@ def execute_delete_email(
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
     """Delete email (trash in Gmail)"""
+    from mail.services import GmailService
+
     if not email.account.is_connected:
         return {
             "success": False,
@@ -448,7 +566,7 @@ def execute_add_label(
     
     # Find label by name (case-insensitive)
     label = Label.objects.filter(
-        account=email.account,
+        account_id=email.account_id,
         name__iexact=label_name
     ).first()
     
@@ -498,7 +616,7 @@ def execute_remove_label(
     
     # Find label by name (case-insensitive)
     label = Label.objects.filter(
-        account=email.account,
+        account_id=email.account_id,
         name__iexact=label_name
     ).first()
     
@@ -532,7 +650,7 @@ def execute_create_job(
     instructions = action.instructions or "Extract job details from this email and create a job record"
     
     # Use AI to extract job information from email
-    email_context = f"Subject: {email.subject}\nFrom: {email.from_name or email.from_address}\nBody:\n{email.body_html[:3000]}"
+    email_context = f"Subject: {email.subject}\nFrom: {email.from_name or email.from_address}\nBody:\n{email.body_text[:3000]}"
     
     extraction_prompt = f"""Extract job information from this email for a line-marking company.
 {instructions}
@@ -561,7 +679,7 @@ Return JSON only, no additional text."""
         )
         
         # Use OpenAI to extract structured data
-        response = client.client.chat.completions.create(
+        response = client.create_chat_completion(
             model="gpt-5-mini",
             messages=[
                 {"role": "system", "content": "You are a data extraction assistant. Extract structured information from emails and return valid JSON only."},
@@ -622,7 +740,7 @@ def execute_extract_information(
     """Extract structured information from email using AI"""
     instructions = action.instructions or "Extract key information from this email"
     
-    email_context = f"Subject: {email.subject}\nFrom: {email.from_name or email.from_address}\nBody:\n{email.body_html[:3000]}"
+    email_context = f"Subject: {email.subject}\nFrom: {email.from_name or email.from_address}\nBody:\n{email.body_text[:3000]}"
     
     extraction_prompt = f"""Extract structured information from this email based on the following requirements:
 {instructions}
@@ -640,7 +758,7 @@ Return a JSON object with the extracted information. Include all relevant detail
 Return JSON only, no additional text."""
 
     try:
-        response = client.client.chat.completions.create(
+        response = client.create_chat_completion(
             model="gpt-5-mini",
             messages=[
                 {"role": "system", "content": "You are a data extraction assistant. Extract structured information from emails and return valid JSON only."},
@@ -679,23 +797,24 @@ def execute_set_priority(
     
     # Parse priority from instructions (1-5 scale)
     priority = None
-    priority_match = re.search(r'\b(?:priority|priority level|set priority)\s*:?\s*(\d+)\b', instructions.lower())
+    lowered = instructions.lower()
+    priority_match = SET_PRIORITY_RE.search(lowered)
     if priority_match:
         priority = int(priority_match.group(1))
-    elif "urgent" in instructions.lower() or "5" in instructions:
+    elif "urgent" in lowered or "5" in instructions:
         priority = 5
-    elif "high" in instructions.lower() or "4" in instructions:
+    elif "high" in lowered or "4" in instructions:
         priority = 4
-    elif "medium" in instructions.lower() or "3" in instructions:
+    elif "medium" in lowered or "3" in instructions:
         priority = 3
-    elif "low" in instructions.lower() or "2" in instructions:
+    elif "low" in lowered or "2" in instructions:
         priority = 2
-    elif "lowest" in instructions.lower() or "1" in instructions:
+    elif "lowest" in lowered or "1" in instructions:
         priority = 1
     
     if priority is None:
         # Try to infer from email content
-        email_text = f"{email.subject} {email.body_html}".lower()
+        email_text = f"{email.subject} {email.body_text}".lower()
         if any(word in email_text for word in ["urgent", "asap", "immediately", "critical"]):
             priority = 5
         elif any(word in email_text for word in ["important", "high priority"]):
@@ -707,14 +826,16 @@ def execute_set_priority(
     priority = max(1, min(5, priority))
     
     # Update task if one exists for this email
-    task = Task.objects.filter(email_message=email, account=email.account).first()
-    if task:
-        task.priority = priority
-        task.save()
+    # Only the pk is needed: update the row without loading it.
+    task_pk = Task.objects.filter(
+        email_message=email, account_id=email.account_id
+    ).values_list("pk", flat=True).first()
+    if task_pk is not None:
+        Task.objects.filter(pk=task_pk).update(priority=priority, updated_at=timezone.now())
         return {
             "success": True,
             "message": f"Task priority set to {priority}",
-            "data": {"task_id": task.pk, "priority": priority, "updated": "task"}
+            "data": {"task_id": task_pk, "priority": priority, "updated": "task"}
         }
     
     # If no task exists, store priority in context for task creation
@@ -734,6 +855,8 @@ def execute_mark_as_read(
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
     """Mark email as read in Gmail"""
+    from mail.services import GmailService
+
     if not email.account.is_connected:
         return {
             "success": False,
@@ -830,6 +953,8 @@ def execute_respond_to_calendar_invite(
     context: Dict[str, Any]
 ) -> Dict[str, Any]:
     """Respond to a calendar invitation (accept/decline/tentative)"""
+    from mail.services import GmailService
+
     if not email.account.is_connected:
         return {
             "success": False,
@@ -910,3 +1035,26 @@ def execute_respond_to_calendar_invite(
                 "message": f"Error responding to calendar invite: {str(e2)}",
                 "data": None
             }
+
+
+# Action.function -> executor. Defined after the executors it references;
+# execute_action only looks it up at call time.
+ACTION_EXECUTORS = {
+    "draft_reply": execute_draft_reply,
+    "send_reply": execute_send_reply,
+    "create_task": execute_create_task,
+    "notify": execute_notify,
+    "schedule": execute_schedule,
+    "forward_email": execute_forward_email,
+    "archive_email": execute_archive_email,
+    "mark_as_spam": execute_mark_as_spam,
+    "delete_email": execute_delete_email,
+    "add_label": execute_add_label,
+    "remove_label": execute_remove_label,
+    "create_job": execute_create_job,
+    "extract_information": execute_extract_information,
+    "set_priority": execute_set_priority,
+    "mark_as_read": execute_mark_as_read,
+    "create_reminder": execute_create_reminder,
+    "respond_to_calendar_invite": execute_respond_to_calendar_invite,
+}
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Action, EmailLabel, Label
+from .models import Action, EmailLabel, Label, QueuedDraftReply
 
 
 @admin.register(Label)
@@ -51,3 +51,9 @@ class ActionAdmin(admin.ModelAdmin):
 class EmailLabelAdmin(admin.ModelAdmin):
     list_display = ("label", "email_message")
     search_fields = ("label__name", "email_message__subject")
+
+
+@admin.register(QueuedDraftReply)
+class QueuedDraftReplyAdmin(admin.ModelAdmin):
+    list_display = ("email_message", "openai_batch_id", "created_at")
+    search_fields = ("email_message__subject", "openai_batch_id")
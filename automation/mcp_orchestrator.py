@@ -177,7 +177,7 @@ def get_ai_action_plan(
             f"User prompt preview: {user_prompt[:500]}..."
         )
         
-        response = client.client.chat.completions.create(
+        response = client.create_chat_completion(
             model="gpt-5-mini",  # Using gpt-5-mini for cost efficiency
             response_format={"type": "json_object"},
             messages=[
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 13:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0004_label_accounts_manytomany'),
+        ('mail', '0006_remove_draft_openai_batch_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedDraftReply',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_body', models.JSONField(help_text='Chat completion request (model and messages)')),
+                ('openai_batch_id', models.CharField(blank=True, db_index=True, help_text='Batch API job this request was submitted in; empty until submitted', max_length=64, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email_message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queued_draft_replies', to='mail.emailmessage')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
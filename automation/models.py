@@ -108,3 +108,26 @@ class Action(models.Model):
         return self.mcp_tool_name or self.function
 
 
+class QueuedDraftReply(models.Model):
+    """
+    A draft_reply waiting on the OpenAI Batch API. The Draft is only created
+    once the reply comes back, so users never see an empty one.
+    """
+    email_message = models.ForeignKey(
+        "mail.EmailMessage", on_delete=models.CASCADE, related_name="queued_draft_replies"
+    )
+    request_body = models.JSONField(help_text="Chat completion request (model and messages)")
+    openai_batch_id = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text="Batch API job this request was submitted in; empty until submitted",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return f"Queued reply to email {self.email_message_id}"
@@ -0,0 +1,83 @@
+"""
+Per-minute OpenAI request and token budget shared by every worker process.
+
+Counters live in the Django cache (Redis when REDIS_CACHE_URL is set), so all
+Celery workers draw from one budget and wait for the next minute instead of
+together overshooting the account limits and spinning in 429 retries. With the
+default local-memory cache the budget is per process.
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+OPENAI_BUDGET_KEY = "automation:openai_budget:{kind}:{window}"
+# Counters outlive their minute so a late incr never restarts a window.
+OPENAI_BUDGET_KEY_TIMEOUT = 120
+OPENAI_BUDGET_MAX_WAIT_SECONDS = 60
+# Web requests give up quickly and ask the user to retry rather than hang.
+OPENAI_BUDGET_REQUEST_MAX_WAIT_SECONDS = 2
+
+
+class OpenAIBudgetExhausted(Exception):
+    """No OpenAI budget became free within the caller's max_wait."""
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough prompt size: about four characters per token for English text."""
+    return sum(len(text or "") for text in texts) // 4 + 1
+
+
+def _take(kind: str, window: int, amount: int, limit: int) -> bool:
+    """Add amount to this window's counter if that keeps it within limit."""
+    if not limit:
+        return True
+    key = OPENAI_BUDGET_KEY.format(kind=kind, window=window)
+    cache.add(key, 0, OPENAI_BUDGET_KEY_TIMEOUT)
+    try:
+        used = cache.incr(key, amount)
+    except ValueError:
+        # Evicted between add and incr; start the window again.
+        cache.add(key, amount, OPENAI_BUDGET_KEY_TIMEOUT)
+        return amount <= limit
+    if used <= limit:
+        return True
+    cache.decr(key, amount)
+    return False
+
+
+def acquire_openai_capacity(
+    estimated_tokens: int, max_wait: float = OPENAI_BUDGET_MAX_WAIT_SECONDS
+) -> bool:
+    """
+    Reserve one request and estimated_tokens tokens in the current minute,
+    sleeping into the next minute while the budget is spent.
+
+    Returns False without reserving anything if that would take longer than
+    max_wait; the caller then goes ahead and relies on the SDK's retries.
+    """
+    requests_limit = settings.OPENAI_REQUESTS_PER_MINUTE
+    tokens_limit = settings.OPENAI_TOKENS_PER_MINUTE
+    if not requests_limit and not tokens_limit:
+        return True
+    # A single oversized prompt must still fit in an empty window.
+    if tokens_limit:
+        estimated_tokens = min(estimated_tokens, tokens_limit)
+    deadline = time.monotonic() + max_wait
+    while True:
+        window = int(time.time() // 60)
+        if _take("requests", window, 1, requests_limit):
+            if _take("tokens", window, estimated_tokens, tokens_limit):
+                return True
+            if requests_limit:
+                cache.decr(OPENAI_BUDGET_KEY.format(kind="requests", window=window), 1)
+        # Jitter so waiting workers don't all wake on the same instant.
+        wait = (window + 1) * 60 - time.time() + random.uniform(0, 1)
+        if time.monotonic() + wait > deadline:
+            logger.warning("OpenAI budget exhausted; sending request without a reservation")
+            return False
+        time.sleep(wait)
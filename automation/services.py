@@ -1,10 +1,8 @@
 import os
 import json
 import logging
-import re
 from datetime import datetime
 from typing import List, Dict, Optional
-from html import unescape
 
 try:
     from openai import OpenAI
@@ -13,14 +11,43 @@ except ImportError:  # pragma: no cover
 
 from mail.models import EmailMessage
 from automation.models import Label
+from automation.rate_limiter import OpenAIBudgetExhausted, acquire_openai_capacity, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# The SDK retries rate limits (429), timeouts and 5xx with exponential backoff.
+OPENAI_MAX_RETRIES = 4
+
+# Batch API job states that have not produced an output file yet.
+OPENAI_BATCH_RUNNING_STATUSES = ("validating", "in_progress", "finalizing", "cancelling")
+# Most requests the Batch API accepts in one job.
+OPENAI_BATCH_MAX_REQUESTS = 50000
+
+DRAFT_REPLY_SYSTEM_PROMPT = "You respond as a polite, concise operations assistant."
+
 
 class OpenAIClient:
     def __init__(self):
         api_key = os.environ.get("OPENAI_API_KEY", "")
-        self.client = OpenAI(api_key=api_key) if OpenAI and api_key else None
+        self.client = (
+            OpenAI(api_key=api_key, max_retries=OPENAI_MAX_RETRIES) if OpenAI and api_key else None
+        )
+
+    def create_chat_completion(self, messages: List[Dict], max_wait: Optional[float] = None, **kwargs):
+        """
+        chat.completions.create, after reserving the request's share of the
+        OpenAI rate budget. Every completion request should go through here.
+
+        Background callers leave max_wait unset: they wait up to a minute for
+        budget and then send anyway. Request paths pass a short max_wait and get
+        OpenAIBudgetExhausted if no budget frees up in time.
+        """
+        estimated_tokens = estimate_tokens(*(message["content"] for message in messages))
+        if max_wait is None:
+            acquire_openai_capacity(estimated_tokens)
+        elif not acquire_openai_capacity(estimated_tokens, max_wait=max_wait):
+            raise OpenAIBudgetExhausted()
+        return self.client.chat.completions.create(messages=messages, **kwargs)
 
     def classify_email(
         self, email_message: EmailMessage, available_labels: List[Label]
@@ -45,7 +72,7 @@ class OpenAIClient:
         try:
             # Prepare email content
             email_subject = email_message.subject or "(No subject)"
-            email_body = self._strip_html(email_message.body_html or "")
+            email_body = email_message.body_text
             email_from = email_message.from_name or email_message.from_address
 
             # Format available labels
@@ -139,7 +166,7 @@ class OpenAIClient:
                 if previous_messages:
                     thread_context = "\n\nPrevious messages in this conversation:\n"
                     for msg in reversed(previous_messages):  # Show in chronological order
-                        prev_body = self._strip_html(msg.body_html or "")[:500]
+                        prev_body = msg.body_text[:500]
                         thread_context += f"- From {msg.from_name or msg.from_address} ({msg.date_sent.strftime('%Y-%m-%d') if msg.date_sent else 'Unknown date'}): {prev_body}\n"
 
             user_prompt = f"""Available Labels:
@@ -171,7 +198,7 @@ Return JSON only, no additional text."""
                 f"User prompt preview: {user_prompt[:500]}..."
             )
             
-            response = self.client.chat.completions.create(
+            response = self.create_chat_completion(
                 model="gpt-5-mini",
                 response_format={"type": "json_object"},
                 messages=[
@@ -224,18 +251,6 @@ Return JSON only, no additional text."""
             lines.append(f"- {label.name}{prompt_text}")
         return "\n".join(lines)
 
-    def _strip_html(self, html: str) -> str:
-        """Strip HTML tags and decode entities"""
-        if not html:
-            return ""
-        # Simple HTML tag removal
-        text = re.sub(r"<[^>]+>", "", html)
-        # Decode HTML entities
-        text = unescape(text)
-        # Clean up whitespace
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
-
     def _validate_priority(self, priority) -> int:
         """Ensure priority is between 1 and 5"""
         try:
@@ -296,7 +311,7 @@ Return JSON only, no additional text."""
         """Legacy method - kept for backwards compatibility"""
         if not self.client:
             return []
-        response = self.client.chat.completions.create(
+        response = self.create_chat_completion(
             model="gpt-5-mini",
             messages=[
                 {"role": "system", "content": "You are classifying emails for a line-marking company."},
@@ -310,23 +325,92 @@ Return JSON only, no additional text."""
         content = choices[0].message.content or ""
         return [line.strip() for line in content.splitlines() if line.strip()]
 
-    def draft_reply(self, instructions: str, context: str):
+    def _draft_system_prompt(self, instructions: str, writing_style: str = None) -> str:
+        """
+        System message for drafting. The per-action instructions and per-account
+        writing style go here rather than in the user message, so requests for
+        the same action and account share a prefix OpenAI can prompt-cache.
+        """
+        system_prompt = f"{DRAFT_REPLY_SYSTEM_PROMPT}\n\nInstructions:\n{instructions}"
+        if writing_style:
+            system_prompt += f"\n\nWriting style: {writing_style}"
+        return system_prompt
+
+    def _draft_reply_messages(self, instructions: str, context: str, writing_style: str = None) -> List[Dict]:
+        return [
+            {"role": "system", "content": self._draft_system_prompt(instructions, writing_style)},
+            {"role": "user", "content": f"Context:\n{context}"},
+        ]
+
+    def draft_reply(self, instructions: str, context: str, writing_style: str = None):
         if not self.client:
             return ""
-        response = self.client.chat.completions.create(
-            model="gpt-5-mini",
-            messages=[
-                {"role": "system", "content": "You respond as a polite, concise operations assistant."},
-                {"role": "user", "content": f"{instructions}\n\nContext:\n{context}"},
-            ],
+        return self.draft_reply_from_request(
+            self.draft_reply_request(instructions, context, writing_style)
         )
+
+    def draft_reply_request(self, instructions: str, context: str, writing_style: str = None) -> Dict:
+        """The chat completion request draft_reply(instructions, context) sends."""
+        return {
+            "model": "gpt-5-mini",
+            "messages": self._draft_reply_messages(instructions, context, writing_style),
+        }
+
+    def draft_reply_from_request(self, request_body: Dict) -> str:
+        """Send a draft_reply_request body directly and return the reply."""
+        response = self.create_chat_completion(**request_body)
         choices = response.choices or []
         if not choices:
             return ""
         # FIX: Use .content not .get("content")
         return choices[0].message.content or ""
-    
-    def rewrite_draft(self, email_context: str, current_draft: str, user_feedback: str, writing_style: str = None):
+
+    def submit_batch(self, requests: Dict[str, Dict]) -> str:
+        """
+        Start a Batch API job for {custom_id: chat completion request} and
+        return its id.
+        """
+        payload = "\n".join(
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body})
+            for custom_id, body in requests.items()
+        ).encode()
+        batch_file = self.client.files.create(file=("batch.jsonl", payload), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def batch_results(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """
+        Message content per custom_id for a finished batch.
+
+        Returns None while the batch is still running. A batch that failed,
+        expired or was cancelled returns whatever requests completed (often
+        nothing).
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in OPENAI_BATCH_RUNNING_STATUSES:
+            return None
+        if not batch.output_file_id:
+            return {}
+        results = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            row = json.loads(line)
+            choices = ((row.get("response") or {}).get("body") or {}).get("choices") or []
+            if choices:
+                results[row["custom_id"]] = choices[0]["message"].get("content") or ""
+        return results
+
+    def rewrite_draft(
+        self,
+        email_context: str,
+        current_draft: str,
+        user_feedback: str,
+        writing_style: str = None,
+        max_wait: Optional[float] = None,
+    ):
         """
         Rewrite a draft email based on user feedback.
         
@@ -335,9 +419,13 @@ Return JSON only, no additional text."""
             current_draft: The current draft body HTML
             user_feedback: User's feedback/instructions for the rewrite
             writing_style: Optional account writing style
+            max_wait: Seconds to wait for OpenAI budget (see create_chat_completion)
             
         Returns:
             Rewritten draft body HTML
+
+        Raises:
+            OpenAIBudgetExhausted: if max_wait is set and no budget freed up in time
         """
         if not self.client:
             return current_draft
@@ -362,17 +450,20 @@ USER FEEDBACK/INSTRUCTIONS:
         user_prompt += "\n\nRewrite the draft email body (HTML format) incorporating the user's feedback. Keep the same tone and structure unless the feedback specifically requests changes."
         
         try:
-            response = self.client.chat.completions.create(
+            response = self.create_chat_completion(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
+                max_wait=max_wait,
             )
             choices = response.choices or []
             if not choices:
                 return current_draft
             return choices[0].message.content or current_draft
+        except OpenAIBudgetExhausted:
+            raise
         except Exception as e:
             logger.error(f"Error rewriting draft: {e}", exc_info=True)
             return current_draft
\ No newline at end of file
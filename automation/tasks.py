@@ -3,9 +3,17 @@ from django.utils import timezone
 from datetime import datetime
 import logging
 
+from accounts.models import Account
+from automation.action_executors import (
+    collect_draft_batch_results,
+    prefetch_for_actions,
+    reply_context,
+    submit_queued_draft_replies,
+)
 from automation.models import Action, EmailLabel, Label
 from automation.services import OpenAIClient
 from automation.task_from_email import ensure_task_for_email
+from automation.utils import setup_account_automation
 from jobs.models import Task, TaskStatus
 from mail.models import Draft, EmailMessage
 
@@ -26,6 +34,21 @@ def parse_due_date(date_str: str | None) -> datetime | None:
         return None
 
 
+@shared_task
+def setup_account_automation_task(account_id: int):
+    """
+    Create the recommended labels and actions for a newly connected account.
+    Queued by the connect views so the OAuth redirect does not wait on the inserts.
+    """
+    account = Account.objects.filter(pk=account_id).first()
+    if account is None:
+        logger.warning(f"[Account Setup] Account {account_id} not found")
+        return None
+    result = setup_account_automation(account)
+    logger.info(f"[Account Setup] Account {account_id}: {result}")
+    return result
+
+
 @shared_task
 def process_email(email_message_id: int):
     """
@@ -124,13 +147,10 @@ def process_email(email_message_id: int):
 
         if not Draft.objects.filter(account=email.account, email_message=email).exists():
             instructions = "Draft a brief, professional reply to this email. Be concise and helpful."
-            if email.account.writing_style:
-                instructions = f"{instructions}\n\nWriting style: {email.account.writing_style}"
-            email_context = (
-                f"Subject: {email.subject}\nFrom: {email.from_address}\nBody:\n{email.body_html or ''}"
-            )
             try:
-                html_body = client.draft_reply(instructions, email_context)
+                html_body = client.draft_reply(
+                    instructions, reply_context(email), writing_style=email.account.writing_style
+                )
             except Exception as e:
                 logger.warning(f"Email {email_message_id}: AI draft_reply failed, using empty body: {e}")
                 html_body = ""
@@ -181,7 +201,7 @@ def trigger_label_actions(label_id: int, email_message_id: int, triggered_by_act
     client = OpenAIClient()
     try:
         label = Label.objects.prefetch_related("actions").get(pk=label_id)
-        email = EmailMessage.objects.select_related("account").get(pk=email_message_id)
+        email = prefetch_for_actions(EmailMessage.objects).get(pk=email_message_id)
     except (Label.DoesNotExist, EmailMessage.DoesNotExist):
         logger.warning(
             f"Label {label_id} or email {email_message_id} not found"
@@ -221,11 +241,23 @@ def trigger_label_actions(label_id: int, email_message_id: int, triggered_by_act
 
 def run_draft_action(email: EmailMessage, action: Action, client: OpenAIClient):
     instructions = action.instructions or action.name
-    context = f"Subject: {email.subject}\nFrom: {email.from_address}\nBody:\n{email.body_html}"
-    html_body = client.draft_reply(instructions, context)
+    html_body = client.draft_reply(instructions, reply_context(email))
     Draft.objects.create(
         account=email.account,
         email_message=email,
         subject=f"Re: {email.subject or 'your message'}",
         body_html=html_body,
     )
+
+
+@shared_task
+def submit_openai_draft_batches():
+    """Send the draft replies queued since the last run as one OpenAI batch."""
+    return {"submitted": submit_queued_draft_replies(OpenAIClient())}
+
+
+@shared_task
+def collect_openai_draft_batches():
+    """Create the drafts of queued replies once their OpenAI batch finishes."""
+    drafted, failed = collect_draft_batch_results(OpenAIClient())
+    return {"drafted": drafted, "failed": failed}
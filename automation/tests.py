@@ -1,13 +1,25 @@
 """
-Tests for automation services (ensure_task_for_email, get_emails_to_process).
+Tests for automation services (ensure_task_for_email, get_emails_to_process,
+action executors).
 These are unit-testable without Celery, AI, or Gmail.
 """
-from django.test import TestCase
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 from accounts.models import Account, Provider
+from automation.action_executors import (
+    collect_draft_batch_results,
+    execute_draft_reply,
+    submit_queued_draft_replies,
+)
+from automation.models import Action, QueuedDraftReply
+from automation.rate_limiter import OpenAIBudgetExhausted, acquire_openai_capacity
+from automation.services import OpenAIClient
 from automation.task_from_email import ensure_task_for_email, get_emails_to_process
 from jobs.models import Task
-from mail.models import EmailMessage, EmailThread
+from mail.models import Draft, EmailMessage, EmailThread, html_to_text
 
 
 class EnsureTaskForEmailTests(TestCase):
@@ -62,3 +74,143 @@ class EnsureTaskForEmailTests(TestCase):
         )
         qs2 = get_emails_to_process(self.account, exclude_threads_with_tasks=True)
         self.assertNotIn(self.email, list(qs2))
+
+
+class BatchExecutorTests(TestCase):
+    """Batch executors with stand-in OpenAI clients."""
+
+    def setUp(self):
+        self.account = Account.objects.create(
+            email="bulk@example.com",
+            provider=Provider.GMAIL,
+            is_connected=True,
+        )
+        self.email = EmailMessage.objects.create(
+            account=self.account,
+            thread=EmailThread.objects.create(account=self.account, external_thread_id="thread-bulk"),
+            external_message_id="msg-bulk",
+            subject="Bulk",
+            from_address="other@example.com",
+            to_addresses=["bulk@example.com"],
+            body_html="<p>Body</p>",
+        )
+
+    def _action(self, function):
+        return Action.objects.create(account=self.account, name=function, function=function)
+
+    def _batch_client(self, reply="<p>from batch</p>"):
+        class BatchAPIClient(OpenAIClient):
+            def __init__(self):
+                self.client = object()
+                self.batches = []
+                self.finished = False
+
+            def submit_batch(self, requests):
+                self.batches.append(requests)
+                return f"batch_{len(self.batches)}"
+
+            def batch_results(self, batch_id):
+                if not self.finished:
+                    return None
+                if reply is None:
+                    return {}
+                return {custom_id: reply for custom_id in self.batches[int(batch_id[6:]) - 1]}
+
+            def draft_reply_from_request(self, request_body):
+                return "<p>direct</p>"
+
+        return BatchAPIClient()
+
+    @override_settings(OPENAI_BATCH_DRAFT_REPLIES=True)
+    def test_queued_draft_replies_are_submitted_in_one_batch(self):
+        other = EmailMessage.objects.create(
+            account=self.account,
+            thread=self.email.thread,
+            external_message_id="msg-bulk-2",
+            subject="Bulk 2",
+            from_address="other@example.com",
+            body_html="<p>Body 2</p>",
+        )
+        client = self._batch_client()
+        action = self._action("draft_reply")
+        for email in (self.email, other):
+            execute_draft_reply(action, email, client, {})
+        self.assertEqual(client.batches, [])
+
+        self.assertEqual(submit_queued_draft_replies(client), 2)
+        self.assertEqual(submit_queued_draft_replies(client), 0)
+        self.assertEqual(len(client.batches), 1)
+        self.assertEqual(len(client.batches[0]), 2)
+
+        self.assertEqual(collect_draft_batch_results(client), (0, 0))
+        self.assertFalse(Draft.objects.exists())
+        client.finished = True
+        self.assertEqual(collect_draft_batch_results(client), (2, 0))
+        self.assertEqual(
+            sorted(Draft.objects.values_list("email_message_id", "body_html")),
+            sorted([(self.email.pk, "<p>from batch</p>"), (other.pk, "<p>from batch</p>")]),
+        )
+        self.assertFalse(QueuedDraftReply.objects.exists())
+
+    @override_settings(OPENAI_BATCH_DRAFT_REPLIES=True)
+    def test_replies_missing_from_a_batch_are_drafted_directly(self):
+        client = self._batch_client(reply=None)
+        execute_draft_reply(self._action("draft_reply"), self.email, client, {})
+        submit_queued_draft_replies(client)
+        client.finished = True
+        self.assertEqual(collect_draft_batch_results(client), (1, 0))
+        self.assertEqual(Draft.objects.get(email_message=self.email).body_html, "<p>direct</p>")
+
+
+@override_settings(OPENAI_REQUESTS_PER_MINUTE=2, OPENAI_TOKENS_PER_MINUTE=1000)
+class OpenAIRateLimiterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch("automation.rate_limiter.time.time", return_value=600.0)
+    def test_budget_is_shared_within_a_minute(self, _time):
+        self.assertTrue(acquire_openai_capacity(100, max_wait=0))
+        self.assertTrue(acquire_openai_capacity(100, max_wait=0))
+        # Third request in the same minute is over the request limit.
+        self.assertFalse(acquire_openai_capacity(100, max_wait=0))
+
+    @mock.patch("automation.rate_limiter.time.time", return_value=600.0)
+    def test_token_limit_rejects_without_spending_a_request(self, _time):
+        self.assertTrue(acquire_openai_capacity(900, max_wait=0))
+        self.assertFalse(acquire_openai_capacity(200, max_wait=0))
+        self.assertTrue(acquire_openai_capacity(100, max_wait=0))
+
+    @mock.patch("automation.rate_limiter.time.time", return_value=600.0)
+    def test_chat_completions_spend_the_shared_budget(self, _time):
+        client = OpenAIClient()
+        client.client = mock.Mock()
+        for _ in range(2):
+            client.create_chat_completion(model="gpt-5-mini", messages=[{"role": "user", "content": "Hi"}])
+        self.assertEqual(client.client.chat.completions.create.call_count, 2)
+        self.assertFalse(acquire_openai_capacity(1, max_wait=0))
+
+    @mock.patch("automation.rate_limiter.time.time", return_value=600.0)
+    def test_rewrite_with_max_wait_raises_instead_of_waiting(self, _time):
+        client = OpenAIClient()
+        client.client = mock.Mock()
+        for _ in range(2):
+            acquire_openai_capacity(1, max_wait=0)
+        with self.assertRaises(OpenAIBudgetExhausted):
+            client.rewrite_draft("context", "<p>Draft</p>", "Shorter", max_wait=0)
+        client.client.chat.completions.create.assert_not_called()
+
+
+class HtmlToTextTests(TestCase):
+    def test_strips_markup_and_invisible_content(self):
+        html = "<html><head><style>p { color: red; }</style></head><body><p>Hi&nbsp;there,</p>\n<p>See   you</p></body></html>"
+        self.assertEqual(html_to_text(html), "Hi there,\nSee you")
+
+    def test_adjacent_blocks_stay_separate(self):
+        self.assertEqual(html_to_text("<p>Hi</p><br>line2"), "Hi\n\nline2")
+        self.assertEqual(html_to_text("<div>one</div><div>two</div>"), "one\ntwo")
+        self.assertEqual(html_to_text("<td>a</td><td>b</td>"), "a b")
+
+    def test_plain_text_body_keeps_its_lines(self):
+        # Plain-text mail is stored wrapped in <pre>.
+        self.assertEqual(html_to_text("<pre>Hello\nline two\n\nBye</pre>"), "Hello\nline two\n\nBye")
+        self.assertEqual(html_to_text("<pre>a\r\nb</pre>"), "a\nb")
@@ -192,16 +192,18 @@ def microsoft_oauth_callback(request):
             code, redirect_uri, scopes=combined_scopes
         )
 
+        # Fetch the Graph profile once; it is used for the user and the account email
+        user_info = MicrosoftOAuthService.get_user_info(token_dict)
+
         # Create or update user
-        user = MicrosoftOAuthService.create_or_update_user(token_dict)
+        user = MicrosoftOAuthService.create_or_update_user(token_dict, user_info=user_info)
 
         # Log the user in
         login(request, user)
 
         # Automatically connect Microsoft email account
         try:
-            # Get email from Microsoft Graph API (more reliable than user.email)
-            user_info = MicrosoftOAuthService.get_user_info(token_dict)
+            # Email from Microsoft Graph API (more reliable than user.email)
             user_email = user_info.get("mail") or user_info.get("userPrincipalName") or user.email
             
             # Get or create account
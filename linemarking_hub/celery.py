@@ -15,4 +15,24 @@ app.conf.beat_schedule = {
         "task": "mail.tasks.sync_all_accounts",
         "schedule": crontab(minute="*"),  # Every minute
     },
+    "refresh-expiring-oauth-tokens": {
+        "task": "accounts.tasks.refresh_expiring_oauth_tokens",
+        "schedule": crontab(minute="*"),  # Every minute
+    },
 }
+
+
+@app.on_after_configure.connect
+def schedule_openai_draft_batches(sender, **kwargs):
+    """Submit and collect Batch API draft replies only when that path is switched on."""
+    from django.conf import settings
+
+    if settings.OPENAI_BATCH_DRAFT_REPLIES:
+        sender.conf.beat_schedule["submit-openai-draft-batches"] = {
+            "task": "automation.tasks.submit_openai_draft_batches",
+            "schedule": crontab(minute="*/15"),  # Every 15 minutes
+        }
+        sender.conf.beat_schedule["collect-openai-draft-batches"] = {
+            "task": "automation.tasks.collect_openai_draft_batches",
+            "schedule": crontab(minute="*/5"),  # Every 5 minutes
+        }
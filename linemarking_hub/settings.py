@@ -98,6 +98,21 @@ if all(
         db_config["OPTIONS"] = {"sslmode": sslmode.lower()}
     DATABASES = {"default": db_config}
 
+# Shared cache for all web and worker processes, e.g. redis://redis:6379/1.
+# Unset, Django's per-process LocMem cache is used.
+REDIS_CACHE_URL = os.environ.get("REDIS_CACHE_URL", "")
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+        }
+    }
+    # Every @login_required request loads the session; read it from the cache
+    # and write through to the DB. Only safe with a cache all processes share,
+    # otherwise a process could serve a stale copy of a session.
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -149,6 +164,10 @@ MICROSOFT_OAUTH_CLIENT_ID = os.environ.get("MICROSOFT_OAUTH_CLIENT_ID", "")
 MICROSOFT_OAUTH_CLIENT_SECRET = os.environ.get("MICROSOFT_OAUTH_CLIENT_SECRET", "")
 MICROSOFT_OAUTH_TENANT_ID = os.environ.get("MICROSOFT_OAUTH_TENANT_ID", "common")
 
+# Refresh an access token once less than this fraction of its lifetime remains
+# (never later than 60s before expiry). 0.1 is ~6 minutes for 1-hour tokens.
+OAUTH_REFRESH_THRESHOLD_RATIO = float(os.environ.get("OAUTH_REFRESH_THRESHOLD_RATIO", "0.1"))
+
 # Authentication Configuration
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
@@ -293,3 +312,13 @@ LOGGING = {
         },
     },
 }
+
+# OpenAI rate budget shared by all workers through the cache (0 disables a limit).
+# Keep these a little under the organisation's limits for the models in use.
+OPENAI_REQUESTS_PER_MINUTE = int(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", "0"))
+OPENAI_TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", "0"))
+
+# Queue automated draft replies on the OpenAI Batch API (half price, drafted
+# within 24 hours) instead of drafting them inline. Also schedules the
+# submit-openai-draft-batches and collect-openai-draft-batches beat jobs.
+OPENAI_BATCH_DRAFT_REPLIES = os.environ.get("OPENAI_BATCH_DRAFT_REPLIES", "false").lower() in ("1", "true", "yes")
@@ -510,7 +510,12 @@ def tasks_list(request):
     form = TaskForm(user=request.user, account=account)
     
     # Check account connection status and token validity for user's accounts
-    user_accounts = request.user.accounts.all() if request.user.is_authenticated else Account.objects.none()
+    # (get_valid_credentials reads account.oauth_token; join it up front)
+    user_accounts = (
+        request.user.accounts.select_related("oauth_token")
+        if request.user.is_authenticated
+        else Account.objects.none()
+    )
     account_statuses = {}
     for acc in user_accounts:
         has_token_error = False
@@ -1551,6 +1556,7 @@ def draft_update(request, pk):
 def draft_rewrite(request, pk):
     """Rewrite a draft using AI based on user feedback"""
     from django.http import JsonResponse
+    from automation.rate_limiter import OPENAI_BUDGET_REQUEST_MAX_WAIT_SECONDS, OpenAIBudgetExhausted
     from automation.services import OpenAIClient
     
     draft = get_object_or_404(Draft, pk=pk)
@@ -1595,12 +1601,19 @@ def draft_rewrite(request, pk):
     
     # Rewrite the draft (without signature)
     client = OpenAIClient()
-    rewritten_body = client.rewrite_draft(
-        email_context=email_context,
-        current_draft=body_without_signature,
-        user_feedback=user_feedback,
-        writing_style=writing_style
-    )
+    try:
+        rewritten_body = client.rewrite_draft(
+            email_context=email_context,
+            current_draft=body_without_signature,
+            user_feedback=user_feedback,
+            writing_style=writing_style,
+            max_wait=OPENAI_BUDGET_REQUEST_MAX_WAIT_SECONDS,
+        )
+    except OpenAIBudgetExhausted:
+        return JsonResponse(
+            {"success": False, "error": "The AI service is busy, please try again in a minute"},
+            status=429,
+        )
     
     # Append signature back to rewritten body
     if signature:
@@ -1934,8 +1947,9 @@ def settings_view(request):
     # Convert to list of grouped labels and sort alphabetically by name
     labels = sorted(list(labels_by_name.values()), key=lambda x: x['name'].lower())
     
-    # Accounts list - filter to show only user's accounts
-    accounts = user_accounts.order_by("email")
+    # Accounts list - filter to show only user's accounts; the token check below
+    # reads account.oauth_token, so join it up front
+    accounts = user_accounts.select_related("oauth_token").order_by("email")
     connected_account_count = user_accounts.filter(is_connected=True).count()
     
     # Check account connection status and token validity
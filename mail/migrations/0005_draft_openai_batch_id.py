@@ -0,0 +1,18 @@
+# Generated by Django 5.2
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mail", "0004_emailattachment_longer_filename"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="draft",
+            name="openai_batch_id",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
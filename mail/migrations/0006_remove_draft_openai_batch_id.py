@@ -0,0 +1,17 @@
+# Generated by Django 5.2
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mail", "0005_draft_openai_batch_id"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="draft",
+            name="openai_batch_id",
+        ),
+    ]
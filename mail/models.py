@@ -1,5 +1,35 @@
+import re
+from functools import cached_property
+from html import unescape
+
 from django.db import models
 
+_HTML_INVISIBLE_RE = re.compile(r"<(style|script|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_PRE_RE = re.compile(r"<pre\b[^>]*>.*?</pre\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(r"<(?:br\b[^>]*|/(?:p|div|li)\s*)>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Spaces within a line; &nbsp; decodes to \xa0.
+_SPACES_RE = re.compile(r"[^\S\n]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def html_to_text(html: str) -> str:
+    """
+    Strip tags (and style/script/head content) and decode entities, keeping
+    one line per <br>, paragraph, div or list item. Line breaks inside <pre>
+    (how plain-text mail is stored) are kept.
+    """
+    if not html:
+        return ""
+    text = _HTML_INVISIBLE_RE.sub("", html)
+    text = _HTML_PRE_RE.sub(lambda m: m.group(0).replace("\n", "<br>"), text)
+    # Other source newlines are just whitespace in HTML; line breaks come from the tags.
+    text = _WHITESPACE_RE.sub(" ", text)
+    text = _HTML_TAG_RE.sub(" ", _HTML_BREAK_RE.sub("\n", text))
+    lines = (line.strip() for line in _SPACES_RE.sub(" ", unescape(text)).split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
 
 class EmailThread(models.Model):
     account = models.ForeignKey(
@@ -48,6 +78,11 @@ class EmailMessage(models.Model):
     def __str__(self):
         return self.subject or self.external_message_id
 
+    @cached_property
+    def body_text(self) -> str:
+        """body_html as plain text, computed once per instance (used for AI prompts)."""
+        return html_to_text(self.body_html)
+
 
 class Draft(models.Model):
     account = models.ForeignKey(
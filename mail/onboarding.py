@@ -1,19 +1,42 @@
 """
-Helpers for post-connect onboarding: queue full sync.
+Helpers for post-connect onboarding: queue automation setup and full sync.
 Used by account OAuth callbacks (Settings and login) to avoid duplicating logic.
 """
 import logging
 
+from celery import chain
+
 from accounts.models import Account
+from automation.tasks import setup_account_automation_task
+from automation.utils import setup_account_automation
 from mail.tasks import sync_account_emails
 
 logger = logging.getLogger(__name__)
 sync_audit = logging.getLogger("mail.sync_audit")
 
 
-def trigger_sync_after_connect(account: Account) -> tuple[bool, str | None]:
+def queue_account_setup(account: Account) -> None:
+    """
+    Queue recommended labels/actions setup for a new account.
+    Runs it inline if the broker is unavailable, so the account is never left without it.
+    """
+    try:
+        setup_account_automation_task.apply_async(args=[account.pk], retry=False)
+    except Exception as e:
+        logger.warning(
+            "Onboarding: could not queue automation setup for account_id=%s (%s); running inline",
+            account.pk, e,
+        )
+        setup_account_automation(account)
+
+
+def trigger_sync_after_connect(
+    account: Account, setup_automation: bool = False
+) -> tuple[bool, str | None]:
     """
     Queue full sync for the account (runs in Celery worker).
+    With setup_automation, the recommended labels/actions setup is queued first
+    in the same chain, so the first synced emails are classified against them.
     Returns (success, error_message). success is True if the task was queued.
     """
     try:
@@ -26,7 +49,15 @@ def trigger_sync_after_connect(account: Account) -> tuple[bool, str | None]:
             extra={"account_id": account.pk},
         )
         # Fail fast if broker is unavailable; do not block OAuth callback flow.
-        sync_account_emails.apply_async(args=[account.pk], retry=False)
+        if setup_automation:
+            chain(
+                setup_account_automation_task.si(account.pk),
+                sync_account_emails.si(account.pk),
+            ).apply_async(retry=False)
+        else:
+            sync_account_emails.apply_async(args=[account.pk], retry=False)
         return True, None
     except Exception as e:
+        if setup_automation:
+            setup_account_automation(account)
         return False, str(e)
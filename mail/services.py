@@ -1081,10 +1081,8 @@ class MicrosoftService(EmailProviderService):
 
     @staticmethod
     def _ensure_send_scope(account: Account) -> None:
-        try:
-            token_scopes = account.oauth_token.get_scopes_list()
-        except Exception:
-            token_scopes = []
+        oauth_token = account.oauth_token_or_none
+        token_scopes = oauth_token.get_scopes_list() if oauth_token else []
         normalized_scopes = {s.lower() for s in token_scopes}
         if token_scopes and "mail.send" not in normalized_scopes:
             raise ValueError(
@@ -1715,6 +1713,8 @@ class EmailSyncService:
                     "message_failures": backfill_message_failures,
                 }
 
+            # last_synced_at is the incremental-sync cursor: keep it in the same
+            # transaction as the stored messages so it only advances with them.
             account.last_synced_at = timezone.now()
             account.save(update_fields=["last_synced_at"])
 
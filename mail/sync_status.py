@@ -5,6 +5,7 @@ SYNC_IN_PROGRESS_KEY = "mail:sync_in_progress:{account_id}"
 LAST_SYNC_ERROR_KEY = "mail:last_sync_error:{account_id}"
 SYNC_LOCK_KEY = "mail:sync_lock:{account_id}"
 STATUS_SYNC_WINDOW_KEY = "mail:status_sync_window:{account_id}"
+SYNC_REQUEST_WINDOW_KEY = "mail:sync_request_window:{account_id}"
 SYNC_IN_PROGRESS_TIMEOUT = 3600  # 1 hour; clears if worker dies
 LAST_SYNC_ERROR_TIMEOUT = 86400  # 24 hours
 
@@ -68,3 +69,21 @@ def should_run_status_sync(account_id: int, min_interval_seconds: int) -> bool:
             timeout=min_interval_seconds,
         )
     )
+
+
+def claim_sync_request(account_id: int, window_seconds: int = 60) -> bool:
+    """
+    Debounce manual "Sync now" requests so a double-click publishes one task.
+    Uses cache.add so only the first request inside the window returns True.
+    """
+    return bool(
+        cache.add(
+            SYNC_REQUEST_WINDOW_KEY.format(account_id=account_id),
+            "1",
+            timeout=window_seconds,
+        )
+    )
+
+
+def release_sync_request(account_id: int) -> None:
+    cache.delete(SYNC_REQUEST_WINDOW_KEY.format(account_id=account_id))
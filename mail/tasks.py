@@ -27,7 +27,10 @@ def sync_account_emails(account_id: int):
     """Sync emails for an account and trigger processing"""
     logger.info("sync_account_emails starting for account_id=%s", account_id)
     try:
-        account = Account.objects.get(pk=account_id)
+        # The provider services read account.oauth_token for credentials; join it here.
+        # Their expiry check (OAuthToken.is_expired) then compares the joined row in
+        # memory, so there is no per-account token query to batch up front.
+        account = Account.objects.select_related("oauth_token").get(pk=account_id)
     except Account.DoesNotExist:
         logger.warning("sync_account_emails: account_id=%s not found", account_id)
         return {"error": "Account not found"}